@@ -0,0 +1,65 @@
+# bench_schema_extraction.py
+# Run from the repo root: python -m benchmarks.bench_schema_extraction [tables]
+# Set BENCH_DB_URI to compare against an existing database (e.g. Oracle) instead of the
+# generated SQLite fixture. SQLite has no set-based catalog views, so its dialect answers the
+# get_multi_* calls table by table; the round-trip savings show up on Oracle.
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+
+from rag.schema_extractor import extract_schema, extract_schema_per_table
+
+
+def build_fixture(db_path: str, tables: int):
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        for i in range(tables):
+            parent = f", parent_id INTEGER REFERENCES table_{i - 1:04d}(id)" if i else ""
+            conn.execute(text(
+                f"CREATE TABLE table_{i:04d} ("
+                f"id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, amount NUMERIC(12, 2), "
+                f"status VARCHAR(20) DEFAULT 'NEW', created_at TIMESTAMP{parent})"
+            ))
+            conn.execute(text(f"CREATE INDEX ix_table_{i:04d}_status ON table_{i:04d}(status)"))
+            conn.execute(text(f"CREATE UNIQUE INDEX ux_table_{i:04d}_name ON table_{i:04d}(name)"))
+    return engine
+
+
+def timed(engine, extractor):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    start = time.perf_counter()
+    result = extractor(engine)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", listener)
+    return result, elapsed, len(statements)
+
+
+def compare(engine):
+    # dispose between runs so neither side benefits from warm connections
+    per_table, per_table_time, per_table_queries = timed(engine, extract_schema_per_table)
+    engine.dispose()
+    bulk, bulk_time, bulk_queries = timed(engine, extract_schema)
+    engine.dispose()
+
+    assert bulk == per_table, "bulk extraction differs from the per-table loop"
+    print(f"dialect: {engine.dialect.name}, tables: {len(bulk)}")
+    print(f"per-table loop : {per_table_time * 1000:9.1f} ms  {per_table_queries:6d} catalog statements")
+    print(f"bulk extractor : {bulk_time * 1000:9.1f} ms  {bulk_queries:6d} catalog statements")
+    print(f"speedup        : {per_table_time / bulk_time:9.2f}x")
+
+
+def main(tables: int = 500):
+    if os.getenv("BENCH_DB_URI"):
+        compare(create_engine(os.getenv("BENCH_DB_URI")))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        compare(build_fixture(os.path.join(tmp, "fixture.db"), tables))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,132 @@
+# bench_startup.py
+# Cold-start timings for the entry points, each run in a fresh interpreter so nothing is already imported:
+#   python -m benchmarks.bench_startup --size medium --runs 5
+# app: import, lifespan until /health reports ready, and the first /query (stub LLM), with and without
+# the schema snapshot from build_artifacts.py. rag: import and index ready, with and without the prebuilt index.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from benchmarks import fixtures, stub_embedding_server, stub_llm_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION = "Give me the top 2 users that have made most payment and collective payment amount"
+
+APP_CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    async with app.app.router.lifespan_context(app.app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            while not (await client.get("/health")).json()["ready"]:
+                await asyncio.sleep(0.002)
+            ready = time.perf_counter()
+            response = (await client.post("/query", json={"user_query": QUESTION, "mode": "table"})).json()
+            answered = time.perf_counter()
+        assert "error" not in response, response
+        print(json.dumps({
+            "import_ms": (imported - start) * 1000,
+            "lifespan_ms": (started - imported) * 1000,
+            # requests are accepted from here on; warm-up (pool, schema, LLM client) continues in the background
+            "serving_ms": (started - start) * 1000,
+            "ready_ms": (ready - start) * 1000,
+            "first_query_ms": (answered - ready) * 1000,
+            "total_ms": (answered - start) * 1000,
+            "reflections": app.services.db_chat.schema_cache.refreshes,
+        }))
+
+asyncio.run(main())
+"""
+
+RAG_CHILD = """
+import json, time
+start = time.perf_counter()
+import embeddings
+imported = time.perf_counter()
+rag = embeddings.RagChat()
+rag.retriever
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "ready_ms": (ready - start) * 1000,
+    "tables": len(rag.retriever.tables),
+}))
+"""
+
+
+def start_server(server) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_child(code: str, cwd: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", f"QUESTION = {QUESTION!r}\n{code}"], cwd=cwd, env={**os.environ, **env},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_of(runs: list[dict]) -> dict:
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def report(label: str, result: dict):
+    print(f"{label:<22} " + "  ".join(f"{key} {value:8.1f}" for key, value in result.items()))
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_uri = fixtures.build(os.path.join(tmp, "payments.db"), args.size)
+        llm_url = start_server(stub_llm_server.serve(port=0, latency=args.latency, token_delay=0.0)) + "/v1"
+        embedding_url = start_server(stub_embedding_server.serve(port=0, latency=0.05))
+        env = {
+            "DB_URI": db_uri, "LLM_BASE_URL": llm_url, "EMBEDDING_BASE_URL": embedding_url, "GEMINI_API_KEY": "stub",
+            "SQL_CACHE_PATH": "", "EMBEDDING_STORE_PATH": os.path.join(tmp, "embeddings.npz"),
+        }
+        snapshot_path = os.path.join(tmp, "schema_snapshot.json")
+        index_path = os.path.join(tmp, "schema_index.npz")
+        subprocess.run(
+            [sys.executable, "build_artifacts.py", "--db-uri", db_uri, "--schema-out", snapshot_path, "--rag-index", index_path],
+            cwd=ROOT, env={**os.environ, **env}, check=True, capture_output=True,
+        )
+        fast_dir = os.path.join(ROOT, "fast")
+        rag_dir = os.path.join(ROOT, "rag")
+        print(f"fixture: {args.size}, median of {args.runs} runs, times in ms")
+        cases = [
+            ("app, reflect", APP_CHILD, fast_dir, {"SCHEMA_ARTIFACT_PATH": ""}),
+            ("app, snapshot", APP_CHILD, fast_dir, {"SCHEMA_ARTIFACT_PATH": snapshot_path}),
+            # an index path that does not exist makes the rag entry point build (and save) it at startup
+            ("rag, build index", RAG_CHILD, rag_dir, {"RAG_INDEX_PATH": os.path.join(tmp, "missing", "index.npz")}),
+            ("rag, prebuilt index", RAG_CHILD, rag_dir, {"RAG_INDEX_PATH": index_path}),
+        ]
+        for label, code, cwd, case_env in cases:
+            runs = []
+            for _ in range(args.runs):
+                runs.append(run_child(code, cwd, {**env, **case_env}))
+                missing_index = os.path.join(tmp, "missing")
+                if os.path.isdir(missing_index):
+                    # keep the "build" case building on every run
+                    for name in os.listdir(missing_index):
+                        os.remove(os.path.join(missing_index, name))
+            report(label, median_of(runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=fixtures.SIZES, default="medium")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency per call, seconds")
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+# fixtures.py
+# Generates a SQLite database with a payments-style schema:
+#   python -m benchmarks.fixtures --size medium --path /tmp/payments.db
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+# users, merchants, payments, and extra tables that only widen the schema the prompt has to carry
+SIZES = {
+    "small": {"users": 100, "merchants": 20, "payments": 2_000, "extra_tables": 0},
+    "medium": {"users": 5_000, "merchants": 200, "payments": 100_000, "extra_tables": 50},
+    "large": {"users": 50_000, "merchants": 1_000, "payments": 1_000_000, "extra_tables": 300},
+}
+
+SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(200) NOT NULL,
+        country VARCHAR(2), created_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE merchants (
+        id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, category VARCHAR(50), country VARCHAR(2))""",
+    """CREATE TABLE payment_methods (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id),
+        kind VARCHAR(20) NOT NULL, last4 VARCHAR(4))""",
+    """CREATE TABLE payments (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id),
+        merchant_id INTEGER NOT NULL REFERENCES merchants(id),
+        payment_method_id INTEGER REFERENCES payment_methods(id),
+        amount NUMERIC(12, 2) NOT NULL, currency VARCHAR(3) NOT NULL, status VARCHAR(20) NOT NULL,
+        created_at TIMESTAMP NOT NULL)""",
+    "CREATE INDEX ix_payments_user ON payments(user_id)",
+    "CREATE INDEX ix_payments_merchant ON payments(merchant_id)",
+    "CREATE INDEX ix_payments_created ON payments(created_at)",
+]
+
+COUNTRIES = ["US", "GB", "IN", "DE", "FR", "CA"]
+CATEGORIES = ["utilities", "telecom", "insurance", "retail", "education", "health"]
+STATUSES = ["SETTLED", "SETTLED", "SETTLED", "PENDING", "FAILED", "REFUNDED"]
+
+
+def build(path: str, size: str = "small", seed: int = 7) -> str:
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    uri = f"sqlite:///{path}"
+    engine = create_engine(uri)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        for i in range(spec["extra_tables"]):
+            conn.execute(text(
+                f"CREATE TABLE audit_{i:03d} (id INTEGER PRIMARY KEY, payment_id INTEGER REFERENCES payments(id), "
+                f"action VARCHAR(30), actor VARCHAR(50), created_at TIMESTAMP)"
+            ))
+
+        conn.execute(text("INSERT INTO users VALUES (:id, :name, :email, :country, :created_at)"), [
+            {"id": i, "name": f"user_{i}", "email": f"user_{i}@example.com",
+             "country": rng.choice(COUNTRIES), "created_at": start + timedelta(minutes=i)}
+            for i in range(1, spec["users"] + 1)
+        ])
+        conn.execute(text("INSERT INTO merchants VALUES (:id, :name, :category, :country)"), [
+            {"id": i, "name": f"merchant_{i}", "category": rng.choice(CATEGORIES), "country": rng.choice(COUNTRIES)}
+            for i in range(1, spec["merchants"] + 1)
+        ])
+        conn.execute(text("INSERT INTO payment_methods VALUES (:id, :user_id, :kind, :last4)"), [
+            {"id": i, "user_id": i, "kind": rng.choice(["card", "ach", "wallet"]), "last4": f"{rng.randint(0, 9999):04d}"}
+            for i in range(1, spec["users"] + 1)
+        ])
+        batch = []
+        for i in range(1, spec["payments"] + 1):
+            user_id = rng.randint(1, spec["users"])
+            batch.append({
+                "id": i, "user_id": user_id, "merchant_id": rng.randint(1, spec["merchants"]),
+                "payment_method_id": user_id, "amount": round(rng.uniform(1, 2_000), 2), "currency": "USD",
+                "status": rng.choice(STATUSES), "created_at": start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+            })
+            if len(batch) == 10_000:
+                conn.execute(text("INSERT INTO payments VALUES (:id, :user_id, :merchant_id, :payment_method_id, :amount, :currency, :status, :created_at)"), batch)
+                batch = []
+        if batch:
+            conn.execute(text("INSERT INTO payments VALUES (:id, :user_id, :merchant_id, :payment_method_id, :amount, :currency, :status, :created_at)"), batch)
+    engine.dispose()
+    return uri
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--path", default="payments_fixture.db")
+    args = parser.parse_args()
+    print(build(args.path, args.size))
@@ -0,0 +1,135 @@
+# load_driver.py
+# Offline end-to-end load test: generated SQLite fixture + stub LLM server, no Gemini or Oracle needed.
+#   python -m benchmarks.load_driver --target direct --size small --concurrency 1,8,32,128
+#   python -m benchmarks.load_driver --target app          (drives /query in-process through ASGI)
+#   python -m benchmarks.load_driver --target http --url http://127.0.0.1:8000/query
+#   add --caches to leave the SQL/result caches and local rendering on (repeat-question workload); without it
+#   every request gets its own question, so /query's single-flight cannot merge them either
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import fixtures, stub_llm_server
+
+FAST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fast")
+QUESTION = "Give me the top 2 users that have made most payment and collective payment amount"
+
+
+def start_stub_llm(latency: float, token_delay: float) -> str:
+    server = stub_llm_server.serve(port=0, latency=latency, token_delay=token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def configure_offline_env(db_uri: str, llm_base_url: str, caches: bool = False):
+    os.environ.update({"DB_URI": db_uri, "LLM_BASE_URL": llm_base_url, "GEMINI_API_KEY": "stub"})
+    if not caches:
+        # one fixed question would otherwise be answered from the SQL/result caches and rendered locally
+        # after the first request, and the run would measure cache lookups instead of the pipeline
+        os.environ.update({"SQL_CACHE_SIZE": "0", "SQL_CACHE_PATH": "", "RESULT_CACHE_MAX_BYTES": "0", "RENDER_MODE": "narrate"})
+    if FAST_DIR not in sys.path:
+        sys.path.insert(0, FAST_DIR)
+
+
+def question_source(question: str, vary: bool):
+    # concurrent identical questions share one pipeline run in the app, which would hide the per-request cost
+    counter = itertools.count()
+    return (lambda: f"{question} (request {next(counter)})") if vary else (lambda: question)
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0, 0, 0)
+    return {"ok": len(latencies), "errors": errors, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "rps": len(latencies) / elapsed}
+
+
+async def run_level(call, concurrency: int, requests: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def report(concurrency: int, result: dict):
+    print(f"{concurrency:>11} {result['ok']:>6} {result['errors']:>6} {result['p50_ms']:>9.1f} "
+          f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['rps']:>9.1f}")
+
+
+async def drive(make_call, levels: list[int], requests: int):
+    print(f"{'concurrency':>11} {'ok':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for concurrency in levels:
+        report(concurrency, await run_level(make_call, concurrency, max(requests, concurrency)))
+
+
+async def main(args):
+    levels = [int(level) for level in args.concurrency.split(",")]
+    next_question = question_source(args.question, not args.caches)
+    if args.target == "http":
+        import httpx
+        async with httpx.AsyncClient(timeout=None) as client:
+            async def call():
+                response = await client.post(args.url, json={"user_query": next_question()})
+                if response.status_code != 200 or "error" in response.json():
+                    raise RuntimeError(response.text)
+            await drive(call, levels, args.requests)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_uri = fixtures.build(os.path.join(tmp, "payments.db"), args.size)
+        configure_offline_env(db_uri, start_stub_llm(args.latency, args.token_delay), args.caches)
+
+        if args.target == "direct":
+            from db_chat_utility import DBChatUtility
+            db_chat = DBChatUtility()
+            db_chat.pool.warm_up()
+
+            async def call():
+                await db_chat.run_async(next_question())
+            await drive(call, levels, args.requests)
+            await db_chat.aclose()
+            return
+
+        import httpx
+        import app as fastapi_app
+        async with fastapi_app.app.router.lifespan_context(fastapi_app.app):
+            transport = httpx.ASGITransport(app=fastapi_app.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                async def call():
+                    response = await client.post("/query", json={"user_query": next_question()})
+                    if "error" in response.json():
+                        raise RuntimeError(response.text)
+                await drive(call, levels, args.requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["direct", "app", "http"], default="direct")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/query")
+    parser.add_argument("--size", choices=fixtures.SIZES, default="small")
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per call, seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--question", default=QUESTION)
+    parser.add_argument("--caches", action="store_true", help="keep the SQL/result caches and RENDER_MODE from the environment")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+# stub_embedding_server.py
+# Local stand-in for the Gemini embedding API (batchEmbedContents) for exercising
+# rag/embedding_client.py without network access:
+#   python -m benchmarks.stub_embedding_server --port 8090 --latency 0.05 --rate-limit 0.1
+#   EMBEDDING_BASE_URL=http://127.0.0.1:8090 python rag/embeddings.py
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text: str, dimensions: int) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def make_handler(latency: float, rate_limit: float, dimensions: int):
+    class StubEmbeddingHandler(BaseHTTPRequestHandler):
+        requests_served = 0
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(latency)
+            if random.random() < rate_limit:
+                self._send(429, {"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+                return
+            if not self.path.endswith(":batchEmbedContents"):
+                self._send(404, {"error": {"code": 404, "message": self.path, "status": "NOT_FOUND"}})
+                return
+            texts = [" ".join(part.get("text", "") for part in request["content"]["parts"]) for request in body["requests"]]
+            type(self).requests_served += 1
+            self._send(200, {"embeddings": [{"values": fake_vector(text, dimensions)} for text in texts]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubEmbeddingHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8090, latency: float = 0.05, rate_limit: float = 0.0, dimensions: int = 768):
+    server = ThreadingHTTPServer((host, port), make_handler(latency, rate_limit, dimensions))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--dimensions", type=int, default=768)
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency, args.rate_limit, args.dimensions)
+    print(f"stub embedding server on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,114 @@
+# stub_llm_server.py
+# Local OpenAI-compatible chat completions endpoint with configurable latency and canned SQL:
+#   python -m benchmarks.stub_llm_server --port 8089 --latency 0.3
+#   LLM_BASE_URL=http://127.0.0.1:8089/v1 uvicorn app:app   (from fast/)
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SQL = (
+    "SELECT u.name, SUM(p.amount) AS total_amount FROM payments p "
+    "JOIN users u ON u.id = p.user_id GROUP BY u.name ORDER BY total_amount DESC LIMIT 2"
+)
+DEFAULT_ANSWER = (
+    "Here are the **top users by payment amount**:\n\n"
+    "| User | Total |\n|---|---|\n| Alice | 1,234.50 |\n| Bob | 987.00 |\n\n"
+    "Alice leads with the highest collective payment amount."
+)
+
+
+def make_handler(latency: float, token_delay: float, sql: str, answer: str):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _reply_text(self, messages: list[dict]) -> str:
+            # the NL->SQL stage is the only one that sends a system prompt
+            return sql if any(m.get("role") == "system" for m in messages) else answer
+
+        def _usage(self, messages: list[dict], text: str) -> dict:
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+            completion_tokens = len(text) // 4 + 1
+            return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+        def _send_json(self, status: int, body: dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, completion_id: str, model: str, text: str, usage: dict | None):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(data: str):
+                payload = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+            for word in text.split(" "):
+                delta = {"index": 0, "delta": {"role": "assistant", "content": word + " "}, "finish_reason": None}
+                send(json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": [delta]}))
+                time.sleep(token_delay)
+            if usage is not None:
+                send(json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": [], "usage": usage}))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            time.sleep(latency)
+            messages = body.get("messages", [])
+            text = self._reply_text(messages)
+            usage = self._usage(messages, text)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            model = body.get("model", "stub")
+            if body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                self._stream(completion_id, model, text, usage if include_usage else None)
+                return
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubLLMHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(host: str = "127.0.0.1", port: int = 8089, latency: float = 0.3, token_delay: float = 0.0,
+          sql: str = DEFAULT_SQL, answer: str = DEFAULT_ANSWER):
+    return StubServer((host, port), make_handler(latency, token_delay, sql, answer))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before every completion starts")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    parser.add_argument("--sql", default=DEFAULT_SQL, help="SQL returned for NL->SQL prompts")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency, args.token_delay, args.sql)
+    print(f"stub LLM server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,47 @@
+# build_artifacts.py
+# Precomputes what the entry points would otherwise build at startup:
+#   python build_artifacts.py                 schema snapshot for fast/ and the schema index for rag/
+#   python build_artifacts.py --no-rag        schema snapshot only (no embedding API calls)
+# The app loads the snapshot from SCHEMA_ARTIFACT_PATH (relative to fast/, where it runs) and still
+# reflects when the database's DDL marker has moved on; rag/embeddings.py loads RAG_INDEX_PATH.
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from fast.schema_cache import SchemaCache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_schema_snapshot(engine, path: str):
+    snapshot = SchemaCache(engine).write_artifact(path)
+    print(f"schema snapshot: {len(snapshot.tables)} tables, version {snapshot.version} -> {path}")
+
+
+def build_rag_index(engine, path: str):
+    sys.path.insert(0, os.path.join(ROOT, "rag"))
+    from embeddings import CACHE_DIR, EmbeddingClient, EMBEDDING_MODEL, build_index
+
+    path = path or os.path.join(CACHE_DIR, "schema_index.npz")
+    store_path = os.getenv("EMBEDDING_STORE_PATH", os.path.join(CACHE_DIR, "schema_embeddings.npz"))
+    retriever = build_index(engine, EmbeddingClient(model=EMBEDDING_MODEL), store_path, path)
+    print(f"schema index: {len(retriever.tables)} tables -> {path}")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    schema_path = os.getenv("SCHEMA_ARTIFACT_PATH") or ".cache/schema_snapshot.json"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-uri", default=os.getenv("DB_URI"))
+    parser.add_argument("--schema-out", default=os.path.join(ROOT, "fast", schema_path))
+    parser.add_argument("--rag-index", default=os.getenv("RAG_INDEX_PATH"))
+    parser.add_argument("--no-rag", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_uri)
+    build_schema_snapshot(engine, args.schema_out)
+    if not args.no_rag:
+        build_rag_index(engine, args.rag_index)
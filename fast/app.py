@@ -1,11 +1,85 @@
 # app.py
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Literal
+
 from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from batch_runner import BatchConfig, BatchRunner, BatchTooLarge
 from db_chat_utility import DBChatUtility
+from engine_pool import dispose_all, pool_stats
+from execution_guard import QueryRejected
+from llm_scheduler import AdmissionRejected, admission_error, rate_limit_error
+from row_cursors import CursorCapacityError, CursorNotFound, CursorOffsetMismatch, columnar_page, ndjson_page
+from metrics import REQUESTS, record_coalesced, render_latest, track_request
+from single_flight import SingleFlight
+from sql_cache import normalize_question
+from tenant_registry import TenantCapacityError, TenantRegistry, UnknownDatabase
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
-db_chat = DBChatUtility()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Services:
+    # built in the lifespan, not at import, so importing the app never touches the database or the LLM
+    def __init__(self):
+        self.db_chat: DBChatUtility | None = None
+        self.tenants: TenantRegistry | None = None
+        self.query_flights = SingleFlight()
+        self.ready = False
+        self.startup: dict[str, float] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._started = 0.0
+
+    async def start(self):
+        self._started = time.perf_counter()
+        self.db_chat = DBChatUtility()
+        self.tenants = TenantRegistry(self.db_chat)
+        self.startup["construct_seconds"] = round(time.perf_counter() - self._started, 4)
+        self._tasks = [asyncio.create_task(self.warm_up()), asyncio.create_task(self.sweep_idle())]
+
+    async def warm_up(self):
+        # runs after the server starts accepting requests; a request that arrives first does the same work on demand
+        start = time.perf_counter()
+        try:
+            await self.db_chat._in_db_executor(self.db_chat.warm_up)
+        except Exception:
+            logger.exception("warm-up failed; connections and schema load on first use")
+        self.startup["warm_up_seconds"] = round(time.perf_counter() - start, 4)
+        self.startup["ready_seconds"] = round(time.perf_counter() - self._started, 4)
+        self.ready = True
+
+    async def sweep_idle(self):
+        # idle cursors and databases pin pooled connections, so they are closed on a timer rather than on next use
+        while True:
+            await asyncio.sleep(max(self.db_chat.row_cursors.ttl / 4, 1))
+            await self.db_chat._in_db_executor(self.db_chat.row_cursors.sweep)
+            await self.db_chat._in_db_executor(self.tenants.sweep)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.db_chat._in_db_executor(self.tenants.close_all)
+        await self.db_chat.aclose()
+        dispose_all()
+
+
+services = Services()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await services.start()
+    yield
+    await services.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,12 +90,256 @@ app.add_middleware(
 )
 class QueryRequest(BaseModel):
     user_query: str
+    include_timings: bool = False
+    # None falls back to RENDER_MODE; see result_renderer.RENDER_MODES
+    mode: Literal["auto", "narrate", "table", "json"] | None = None
+    # None is the DB_URI database; other ids come from DATABASES_FILE or DB_URI_<ID>
+    database_id: str | None = None
+
+
+def too_many_requests(e: AdmissionRejected, body: dict | None = None) -> JSONResponse:
+    return JSONResponse({**e.as_dict(), **(body or {})}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+
+
+def database_error(e: UnknownDatabase | TenantCapacityError) -> JSONResponse:
+    if isinstance(e, UnknownDatabase):
+        return JSONResponse({"error": str(e), "code": "unknown_database"}, status_code=404)
+    return JSONResponse({"error": str(e), "code": "database_capacity"}, status_code=503, headers={"Retry-After": "5"})
 
 
 @app.post("/query")
-def query_db(request: QueryRequest):
+async def query_db(request: QueryRequest):
+    if services.db_chat.scheduler.is_full():
+        REQUESTS.labels("query", "throttled").inc()
+        return too_many_requests(AdmissionRejected("queue_full", services.db_chat.scheduler.retry_after()))
+    with track_request() as timings, services.db_chat.scheduler.request_deadline():
+        rejected = None
+        try:
+            async with services.tenants.use(request.database_id) as chat:
+                # identical questions arriving together share one pipeline run, result or error; the key folds only
+                # case and whitespace, so "> 100" and "< 100" or "-5" and "5" never share a run
+                mode = request.mode or chat.render_config.default_mode
+                key = (chat.database_id, normalize_question(request.user_query), mode)
+                response, coalesced = await services.query_flights.do(key, lambda: chat.run_async(request.user_query, mode))
+            if coalesced:
+                record_coalesced("query")
+            body = {"response": response}
+            REQUESTS.labels("query", "ok").inc()
+        except (UnknownDatabase, TenantCapacityError) as e:
+            REQUESTS.labels("query", "rejected").inc()
+            return database_error(e)
+        except QueryRejected as e:
+            body = e.as_dict()
+            REQUESTS.labels("query", "rejected").inc()
+        except (AdmissionRejected, rate_limit_error()) as e:
+            rejected = admission_error(e)
+            body = {}
+            REQUESTS.labels("query", "throttled").inc()
+        except Exception as e:
+            body = {"error": str(e)}
+            REQUESTS.labels("query", "error").inc()
+    if request.include_timings:
+        body["timings"] = timings.as_dict()
+    if rejected is not None:
+        return too_many_requests(rejected, body)
+    return body
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_db_stream(request: QueryRequest):
+    if services.db_chat.scheduler.is_full():
+        REQUESTS.labels("query_stream", "throttled").inc()
+        return too_many_requests(AdmissionRejected("queue_full", services.db_chat.scheduler.retry_after()))
+
+    async def events():
+        with track_request() as timings, services.db_chat.scheduler.request_deadline():
+            try:
+                async with services.tenants.use(request.database_id) as chat:
+                    async for event, data in chat.stream_run(request.user_query, request.mode):
+                        yield sse_event(event, data)
+                REQUESTS.labels("query_stream", "ok").inc()
+            except (UnknownDatabase, TenantCapacityError) as e:
+                REQUESTS.labels("query_stream", "rejected").inc()
+                yield sse_event("error", {"error": str(e)})
+                return
+            except QueryRejected as e:
+                REQUESTS.labels("query_stream", "rejected").inc()
+                yield sse_event("error", e.as_dict())
+                return
+            except (AdmissionRejected, rate_limit_error()) as e:
+                REQUESTS.labels("query_stream", "throttled").inc()
+                yield sse_event("error", admission_error(e).as_dict())
+                return
+            except Exception as e:
+                REQUESTS.labels("query_stream", "error").inc()
+                yield sse_event("error", {"error": str(e)})
+                return
+        yield sse_event("done", {"timings": timings.as_dict()} if request.include_timings else {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class BatchRequest(BaseModel):
+    questions: list[str]
+    include_timings: bool = False
+    mode: Literal["auto", "narrate", "table", "json"] | None = None
+    database_id: str | None = None
+    # None means BATCH_GENERATION_CONCURRENCY / BATCH_EXECUTION_CONCURRENCY, which also cap these
+    generation_concurrency: int | None = Field(default=None, gt=0)
+    execution_concurrency: int | None = Field(default=None, gt=0)
+
+
+@app.post("/query/batch")
+async def query_batch(request: BatchRequest):
+    if services.db_chat.scheduler.is_full():
+        REQUESTS.labels("query_batch", "throttled").inc()
+        return too_many_requests(AdmissionRejected("queue_full", services.db_chat.scheduler.retry_after()))
+    config = BatchConfig()
     try:
-        response = db_chat.run(request.user_query)
-        return {"response": response}
+        config.check_size(request.questions)
+        if request.database_id not in (None, "default"):
+            services.tenants.resolve_uri(request.database_id)
+    except BatchTooLarge as e:
+        return JSONResponse({"error": str(e), "code": "batch_too_large", "limit": e.limit}, status_code=413)
+    except UnknownDatabase as e:
+        return database_error(e)
+
+    async def lines():
+        # one JSON object per line: header, one per distinct question as it finishes, summary
+        try:
+            async with services.tenants.use(request.database_id) as chat:
+                runner = BatchRunner(chat, request.mode, config, request.generation_concurrency, request.execution_concurrency)
+                async for item in runner.run(request.questions):
+                    if "status" in item:
+                        REQUESTS.labels("query_batch", item["status"]).inc()
+                        if not request.include_timings:
+                            item.pop("timings")
+                    yield json.dumps(item, default=str) + "\n"
+        except TenantCapacityError as e:
+            yield json.dumps({"error": str(e), "code": "database_capacity"}) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+class RowsRequest(BaseModel):
+    user_query: str
+    page_size: int | None = None
+    format: Literal["columnar", "ndjson"] = "columnar"
+    database_id: str | None = None
+
+
+def rows_response(cursor, rows: list, offset: int, format: str, extra: dict | None = None):
+    if format == "ndjson":
+        return StreamingResponse(ndjson_page(cursor, rows, offset), media_type="application/x-ndjson")
+    return {**columnar_page(cursor, rows, offset), **(extra or {})}
+
+
+@app.post("/query/rows")
+async def query_rows(request: RowsRequest):
+    try:
+        async with services.tenants.use(request.database_id) as chat:
+            sql_query, params, cursor = await chat.open_rows_async(request.user_query)
+            cursor, rows = await chat.fetch_rows_async(cursor.id, 0, request.page_size)
+        REQUESTS.labels("query_rows", "ok").inc()
+    except (UnknownDatabase, TenantCapacityError) as e:
+        REQUESTS.labels("query_rows", "rejected").inc()
+        return database_error(e)
+    except QueryRejected as e:
+        REQUESTS.labels("query_rows", "rejected").inc()
+        return e.as_dict()
+    except CursorCapacityError as e:
+        REQUESTS.labels("query_rows", "throttled").inc()
+        return JSONResponse({"error": str(e), "code": "cursor_capacity", "retry_after": e.retry_after},
+                            status_code=503, headers={"Retry-After": str(e.retry_after)})
+    except (AdmissionRejected, rate_limit_error()) as e:
+        REQUESTS.labels("query_rows", "throttled").inc()
+        return too_many_requests(admission_error(e))
     except Exception as e:
+        REQUESTS.labels("query_rows", "error").inc()
         return {"error": str(e)}
+    return rows_response(cursor, rows, 0, request.format, {"sql": chat.inline_sql(sql_query, params)})
+
+
+@app.get("/rows/{cursor_id}")
+async def get_rows(cursor_id: str, offset: int, limit: int | None = None,
+                   format: Literal["columnar", "ndjson"] = "columnar", database_id: str | None = None):
+    try:
+        chat = services.tenants.get(database_id)
+        if chat is None:
+            raise CursorNotFound(cursor_id)
+        cursor, rows = await chat.fetch_rows_async(cursor_id, offset, limit)
+        REQUESTS.labels("rows", "ok").inc()
+    except UnknownDatabase as e:
+        REQUESTS.labels("rows", "rejected").inc()
+        return database_error(e)
+    except CursorNotFound as e:
+        REQUESTS.labels("rows", "rejected").inc()
+        return JSONResponse({"error": str(e), "code": "cursor_not_found"}, status_code=404)
+    except CursorOffsetMismatch as e:
+        REQUESTS.labels("rows", "rejected").inc()
+        return JSONResponse({"error": str(e), "code": "offset_mismatch", "offset": e.expected}, status_code=409)
+    except QueryRejected as e:
+        # a page that runs past the statement timeout, same body as /query/rows
+        REQUESTS.labels("rows", "rejected").inc()
+        return e.as_dict()
+    except Exception as e:
+        REQUESTS.labels("rows", "error").inc()
+        return {"error": str(e)}
+    return rows_response(cursor, rows, offset, format)
+
+
+@app.delete("/rows/{cursor_id}")
+async def close_rows(cursor_id: str, database_id: str | None = None):
+    try:
+        chat = services.tenants.get(database_id)
+    except UnknownDatabase as e:
+        return database_error(e)
+    if chat is None:
+        return {"closed": False}
+    return {"closed": await chat._in_db_executor(chat.row_cursors.close, cursor_id)}
+
+
+@app.get("/metrics")
+def metrics():
+    payload, content_type = render_latest()
+    return Response(payload, media_type=content_type)
+
+
+@app.get("/health")
+def health():
+    return {"ready": services.ready, "startup": services.startup}
+
+
+@app.get("/stats/pool")
+def get_pool_stats():
+    return pool_stats()
+
+
+@app.get("/stats/databases")
+def get_database_stats():
+    return services.tenants.stats()
+
+
+@app.get("/stats/rows")
+def get_row_cursor_stats():
+    return services.db_chat.row_cursors.stats()
+
+
+@app.get("/stats/llm")
+def get_llm_stats():
+    return services.db_chat.scheduler.stats()
+
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    return {
+        "sql": services.db_chat.sql_cache.stats(),
+        "sql_templates": services.db_chat.template_cache.stats(),
+        "results": services.db_chat.result_cache.stats(),
+    }
@@ -0,0 +1,120 @@
+# batch_runner.py
+import asyncio
+import os
+import time
+
+from execution_guard import QueryRejected
+from llm_scheduler import admission_error
+from metrics import track_request
+from sql_cache import normalize_question
+
+
+class BatchTooLarge(Exception):
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"Batch has {size} questions, the limit is {limit}")
+
+
+class BatchConfig:
+    def __init__(self):
+        self.max_questions = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+        # LLM calls (generation, repair, narration) and DB executions are limited separately,
+        # so slow queries do not hold back prompts and a burst of prompts cannot drain the pool
+        self.generation_concurrency = int(os.getenv("BATCH_GENERATION_CONCURRENCY", "8"))
+        self.execution_concurrency = int(os.getenv("BATCH_EXECUTION_CONCURRENCY", "4"))
+        self.admission_retries = int(os.getenv("BATCH_ADMISSION_RETRIES", "2"))
+
+    def check_size(self, questions: list[str]):
+        if len(questions) > self.max_questions:
+            raise BatchTooLarge(len(questions), self.max_questions)
+
+
+def dedupe(questions: list[str]) -> list[tuple[str, list[int]]]:
+    # questions that normalize the same run once; the result goes out with every position they were sent at.
+    # only case, whitespace and sentence punctuation fold, so "> 100" and "< 100" stay separate questions
+    positions: dict[str, tuple[str, list[int]]] = {}
+    for index, question in enumerate(questions):
+        positions.setdefault(normalize_question(question), (question, []))[1].append(index)
+    return list(positions.values())
+
+
+class BatchRunner:
+    def __init__(self, chat, mode: str | None = None, config: BatchConfig | None = None,
+                 generation_concurrency: int | None = None, execution_concurrency: int | None = None):
+        self.chat = chat
+        self.mode = mode
+        self.config = config or BatchConfig()
+        # a request may lower the configured limits, never raise them
+        self.generation = asyncio.Semaphore(min(generation_concurrency or self.config.generation_concurrency,
+                                                self.config.generation_concurrency))
+        self.execution = asyncio.Semaphore(min(execution_concurrency or self.config.execution_concurrency,
+                                               self.config.execution_concurrency))
+
+    async def _answer(self, question: str, snapshot) -> dict:
+        async with self.generation:
+            sql_query, params = await self.chat.generate_sql_async(question, snapshot)
+        async with self.execution:
+            sql_query, params, db_result = await self.chat._execute_with_repair_async(question, sql_query, params)
+        sql_query = self.chat.inline_sql(sql_query, params)
+        mode, rendered = self.chat.render_result(self.mode, db_result)
+        if rendered is None:
+            async with self.generation:
+                rendered = await self.chat.process_result_async(question, sql_query, db_result)
+        return {
+            "sql": sql_query,
+            "mode": mode,
+            "row_count": db_result.row_count,
+            "truncated": db_result.truncated,
+            "response": rendered,
+        }
+
+    async def _run_one(self, question: str, indexes: list[int], snapshot) -> dict:
+        item = {"indexes": indexes, "question": question}
+        with track_request() as timings:
+            for attempt in range(self.config.admission_retries + 1):
+                try:
+                    # each question gets its own LLM queue deadline, not a share of the whole batch's
+                    with self.chat.scheduler.request_deadline():
+                        item.update(await self._answer(question, snapshot))
+                    status = "ok"
+                    break
+                except QueryRejected as e:
+                    status = "rejected"
+                    item.update(e.as_dict())
+                    break
+                except Exception as e:
+                    rejected = admission_error(e)
+                    if rejected is None:
+                        status = "error"
+                        item["error"] = str(e)
+                        break
+                    if attempt == self.config.admission_retries:
+                        status = "throttled"
+                        item.update(rejected.as_dict())
+                        break
+                    # a scheduled batch can wait out the back-off instead of failing the question
+                    await asyncio.sleep(rejected.retry_after)
+        item["status"] = status
+        item["timings"] = timings.as_dict()
+        return item
+
+    async def run(self, questions: list[str]):
+        # yields the header, then one item per distinct question in completion order, then the summary
+        start = time.perf_counter()
+        items = dedupe(questions)
+        # every question is prompted against the same schema version, even if DDL lands mid-batch
+        snapshot = await self.chat._in_db_executor(self.chat.schema_cache.get)
+        yield {"questions": len(questions), "distinct": len(items), "schema_version": snapshot.version}
+        tasks = [asyncio.create_task(self._run_one(question, indexes, snapshot)) for question, indexes in items]
+        counts = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                counts[item["status"]] = counts.get(item["status"], 0) + 1
+                yield item
+        finally:
+            # a client that disconnects mid-batch stops the questions still running
+            for task in tasks:
+                task.cancel()
+        yield {"done": True, "counts": counts, "elapsed_seconds": round(time.perf_counter() - start, 4)}
@@ -1,45 +1,164 @@
 # db_chat_utility.py
+import asyncio
+import contextvars
+import logging
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect, text
-from openai import OpenAI
-from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from engine_pool import PoolConfig, dispose_engine, get_pooled_engine
+from execution_guard import ExecutionGuard, GuardConfig
+from llm_scheduler import LLMScheduler
+from metrics import record_cache, record_retry, record_rows, record_usage, stage
+from result_cache import ResultCache
+from result_renderer import RenderConfig, render_json, render_markdown, resolve_mode
+from row_cursors import RowCursor, RowCursorRegistry
+from result_summary import QueryResult, ResultConfig, fetch_bounded, result_for_prompt
+from schema_cache import SchemaCache, SchemaSnapshot
+from schema_pruner import SchemaPruner
+from sql_cache import SQLCache
+from sql_templates import bind_params, extract_literals, inline, parameterize
+from sql_validator import SQLValidationError, clean_sql, validate_sql
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+logger = logging.getLogger(__name__)
+# openai is imported at most once, by whichever thread builds the first client; a request thread
+# importing it at the same time as the warm-up thread sees a half-initialized package
+_llm_import_lock = threading.Lock()
 
 
 class DBChatUtility:
-    def __init__(self):
+    def __init__(self, db_uri: str | None = None, database_id: str = "default",
+                 pool_config: PoolConfig | None = None, shared: "DBChatUtility | None" = None):
         load_dotenv()
-        self.client = OpenAI(
-            api_key=os.getenv("GEMINI_API_KEY"),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
-        self.db_uri = os.getenv("DB_URI")
+        self.database_id = database_id
+        # additional databases reuse the LLM clients and the rate limiter of the default one
+        self._shared = shared
+        self._owns_llm = shared is None
+        self.base_url = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+        if shared is not None:
+            self.model = shared.model
+            self.scheduler = shared.scheduler
+        else:
+            self.model = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+            # async LLM calls wait here for RPM/TPM capacity instead of running into the provider's rate limit
+            self.scheduler = LLMScheduler()
+        self.db_uri = db_uri or os.getenv("DB_URI")
+        self.pool = get_pooled_engine(self.db_uri, pool_config)
+        self.schema_cache = SchemaCache(self.pool.engine)
+        self.result_config = ResultConfig()
+        self.render_config = RenderConfig()
+        self.result_cache = ResultCache(self.pool.engine)
+        self.guard = ExecutionGuard(self.pool.engine.dialect.name, GuardConfig(self.result_config.row_cap))
+        self.row_cursors = RowCursorRegistry(self.pool, self.guard)
+        self.prune_schema = os.getenv("SCHEMA_PRUNE", "true").lower() == "true"
+        self._pruner: tuple[str, SchemaPruner] | None = None
+        self.repair_attempts = int(os.getenv("SQL_REPAIR_ATTEMPTS", "2"))
+        self.sql_candidates = int(os.getenv("SQL_CANDIDATES", "1"))
+        # every database keeps its own tables in the cache file, so schema versions never evict each other
+        suffix = "" if database_id == "default" else "_" + re.sub(r"\W", "_", database_id)
+        self.sql_cache = SQLCache(table=f"sql_cache{suffix}")
+        self.template_cache = SQLCache(path=self.sql_cache.path, table=f"sql_templates{suffix}")
+        # blocking DB work for the async path runs here, sized to the pool so it never queues on checkout
+        pool_capacity = self.pool.config.pool_size + self.pool.config.max_overflow
+        db_workers = int(os.getenv("DB_EXECUTOR_WORKERS", str(pool_capacity))) if shared is None else pool_capacity
+        self.db_executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="db")
+
+    # the openai package takes about half a second to import, so clients are built on first use
+    @cached_property
+    def client(self):
+        if self._shared is not None:
+            return self._shared.client
+        with _llm_import_lock:
+            from openai import OpenAI
+            return OpenAI(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                base_url=self.base_url
+            )
+
+    @cached_property
+    def async_client(self):
+        if self._shared is not None:
+            return self._shared.async_client
+        with _llm_import_lock:
+            # two threads can race past cached_property; the loser returns the winner's client
+            if "async_client" in self.__dict__:
+                return self.__dict__["async_client"]
+            from openai import AsyncOpenAI
+            return AsyncOpenAI(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                base_url=self.base_url
+            )
+
+    async def _llm(self):
+        # the first construction imports openai; it runs in the executor so the event loop never blocks on it
+        if "async_client" not in self.__dict__:
+            return await self._in_db_executor(lambda: self.async_client)
+        return self.async_client
+
+    def warm_up(self):
+        # connections, schema snapshot and LLM client, so the first request pays for none of them
+        self.pool.warm_up()
+        self.schema_cache.get()
+        self.async_client
 
     def _get_engine(self):
-        return create_engine(self.db_uri)
+        return self.pool.engine
+
+    async def _in_db_executor(self, func, *args):
+        # carry the request context over so stage timings land on the right request
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, context.run, func, *args)
 
     def get_schema_info(self):
-        engine = self._get_engine()
-        insp = inspect(engine)
-        schema = {}
-        for table in insp.get_table_names():
-            cols = [col["name"] for col in insp.get_columns(table)]
-            schema[table] = cols
-        return schema
-
-    def execute_query(self, query: str):
-        engine = self._get_engine()
-        with engine.connect() as conn:
-            result = conn.execute(text(query))
-            rows = result.fetchall()
-        return rows
-
-    def generate_sql(self, user_query: str) -> str:
-        schema = self.get_schema_info()
-        db_query_request_messages: list[ChatCompletionSystemMessageParam | ChatCompletionUserMessageParam] = [
-            ChatCompletionSystemMessageParam(
-                role="system",
-                content=f"""You are an expert Oracle SQL assistant. The database is Oracle DB.
+        return self.schema_cache.get().tables
+
+    def execute_query(self, query: str, params: dict | None = None) -> QueryResult:
+        with stage("result_cache"):
+            ticket, cached = self.result_cache.lookup(query, params)
+        if ticket is not None or cached is not None:
+            record_cache("result", cached is not None)
+        if cached is not None:
+            return cached
+        arraysize = self.result_config.arraysize
+        guarded_query = self.guard.limit(query)
+        with stage("execute"), self.pool.connect() as conn:
+            self.guard.check_plan(conn, guarded_query, params)
+            with self.guard.timeout(conn):
+                result = conn.execution_options(yield_per=arraysize).execute(text(guarded_query), params or {})
+                db_result = fetch_bounded(result, arraysize, self.result_config.row_cap)
+        record_rows(db_result.row_count)
+        self.result_cache.store(ticket, db_result)
+        return db_result
+
+    async def execute_query_async(self, query: str, params: dict | None = None):
+        return await self._in_db_executor(self.execute_query, query, params)
+
+    def _prompt_schema(self, user_query: str, snapshot: SchemaSnapshot | None = None) -> tuple[SchemaSnapshot, str]:
+        with stage("schema"):
+            snapshot = snapshot or self.schema_cache.get()
+            if not self.prune_schema:
+                return snapshot, snapshot.text
+            # the pruner indexes identifiers once per schema version
+            if self._pruner is None or self._pruner[0] != snapshot.version:
+                self._pruner = (snapshot.version, SchemaPruner(snapshot.tables, snapshot.foreign_keys))
+            return snapshot, self._pruner[1].prune(user_query)
+
+    def _sql_messages(self, user_query: str, schema: str):
+        # plain dicts, so building a prompt never imports openai on the request path
+        db_query_request_messages: "list[ChatCompletionMessageParam]" = [
+            {
+                "role": "system",
+                "content": f"""You are an expert Oracle SQL assistant. The database is Oracle DB.
                             Use only the provided schema to answer queries.
                             STRICT OUTPUT RULES:
                             - Output ONLY raw SQL text
@@ -48,34 +167,298 @@ class DBChatUtility:
 
                             Schema:\n {schema}
                             """
-            ),
-            ChatCompletionUserMessageParam(role="user", content=user_query)
+            },
+            {"role": "user", "content": user_query}
         ]
-        response = self.client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=db_query_request_messages
-        )
-        print('\n\n', {'user_query': user_query, 'response': response.choices[0].message.content.strip()}, end='\n\n' )
-        return response.choices[0].message.content.strip()
+        return db_query_request_messages
+
+    def _repair_messages(self, messages: list, sql_query: str, problems: list[str]):
+        return messages + [
+            {"role": "assistant", "content": sql_query},
+            {
+                "role": "user",
+                "content": f"""That SQL cannot be run:
+                            {chr(10).join("- " + problem for problem in problems)}
+                            Return only the corrected SQL, following the same output rules."""
+            }
+        ]
+
+    def _validate(self, sql_query: str, snapshot: SchemaSnapshot) -> list[str]:
+        with stage("validate_sql"):
+            return validate_sql(sql_query, snapshot.tables, self.pool.engine.dialect.name)
+
+    def _complete_sql(self, messages: list) -> str:
+        with stage("generate_sql"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages
+            )
+        record_usage("generate_sql", response.usage)
+        return clean_sql(response.choices[0].message.content)
+
+    async def _complete_sql_async(self, messages: list) -> str:
+        client = await self._llm()
+        reserved = await self.scheduler.acquire(messages)
+        with stage("generate_sql"):
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=messages
+            )
+        self.scheduler.settle(reserved, response.usage)
+        record_usage("generate_sql", response.usage)
+        return clean_sql(response.choices[0].message.content)
+
+    async def _first_valid_candidate(self, messages: list, snapshot: SchemaSnapshot) -> tuple[str, list[str]]:
+        # several completions race; the first one that validates wins and the rest are cancelled
+        tasks = [asyncio.create_task(self._complete_sql_async(messages)) for _ in range(self.sql_candidates)]
+        fallback = None
+        error = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    sql_query = await next_done
+                except Exception as e:
+                    error = e
+                    continue
+                problems = self._validate(sql_query, snapshot)
+                if not problems:
+                    return sql_query, []
+                fallback = fallback or (sql_query, problems)
+        finally:
+            for task in tasks:
+                task.cancel()
+        if fallback is None:
+            raise error
+        return fallback
+
+    def _repair(self, messages: list, snapshot: SchemaSnapshot, sql_query: str, problems: list[str]) -> str:
+        attempts = 0
+        while problems and attempts < self.repair_attempts:
+            attempts += 1
+            record_retry("generate_sql")
+            logger.info("repairing sql (attempt %d): %s", attempts, problems)
+            sql_query = self._complete_sql(self._repair_messages(messages, sql_query, problems))
+            problems = self._validate(sql_query, snapshot)
+        if problems:
+            raise SQLValidationError(sql_query, problems)
+        return sql_query
+
+    async def _repair_async(self, messages: list, snapshot: SchemaSnapshot, sql_query: str, problems: list[str]) -> str:
+        attempts = 0
+        while problems and attempts < self.repair_attempts:
+            attempts += 1
+            record_retry("generate_sql")
+            logger.info("repairing sql (attempt %d): %s", attempts, problems)
+            sql_query = await self._complete_sql_async(self._repair_messages(messages, sql_query, problems))
+            problems = self._validate(sql_query, snapshot)
+        if problems:
+            raise SQLValidationError(sql_query, problems)
+        return sql_query
 
-    def process_result(self, user_query: str, sql_query: str, db_result: list) -> str:
-        process_result_request = [
-            ChatCompletionUserMessageParam(
-                role="user",
-                content=f"""You are a helpful assistant. 
+    def inline_sql(self, sql_query: str, params: dict) -> str:
+        return inline(sql_query, params, self.pool.engine.dialect.name)
+
+    def _cached_sql(self, user_query: str, snapshot: SchemaSnapshot | None = None) -> tuple[str, dict] | None:
+        with stage("sql_cache"):
+            version = (snapshot or self.schema_cache.get()).version
+            question_template, values = extract_literals(user_query)
+            if values:
+                template = self.template_cache.get(question_template, version)
+                record_cache("sql_template", template is not None)
+                if template is not None:
+                    return template, bind_params(values)
+            sql_query = self.sql_cache.get(user_query, version)
+        record_cache("sql", sql_query is not None)
+        return (sql_query, {}) if sql_query is not None else None
+
+    def _remember_sql(self, user_query: str, sql_query: str, version: str | None = None) -> tuple[str, dict]:
+        # questions whose literals map cleanly onto the SQL are stored as a template and run with binds
+        version = version or self.schema_cache.get().version
+        question_template, values = extract_literals(user_query)
+        template = parameterize(sql_query, values, self.pool.engine.dialect.name)
+        if template is not None:
+            self.template_cache.put(question_template, version, template)
+            return template, bind_params(values)
+        self.sql_cache.put(user_query, version, sql_query)
+        return sql_query, {}
+
+    def generate_sql(self, user_query: str) -> tuple[str, dict]:
+        cached = self._cached_sql(user_query)
+        if cached is not None:
+            return cached
+        snapshot, schema = self._prompt_schema(user_query)
+        messages = self._sql_messages(user_query, schema)
+        sql_query = self._complete_sql(messages)
+        sql_query = self._repair(messages, snapshot, sql_query, self._validate(sql_query, snapshot))
+        logger.info("generated sql for %r: %s", user_query, sql_query)
+        return self._remember_sql(user_query, sql_query, snapshot.version)
+
+    async def generate_sql_async(self, user_query: str, snapshot: SchemaSnapshot | None = None) -> tuple[str, dict]:
+        # callers answering several questions pass one snapshot so they all see the same schema version
+        cached = await self._in_db_executor(self._cached_sql, user_query, snapshot)
+        if cached is not None:
+            return cached
+        snapshot, schema = await self._in_db_executor(self._prompt_schema, user_query, snapshot)
+        messages = self._sql_messages(user_query, schema)
+        if self.sql_candidates > 1:
+            sql_query, problems = await self._first_valid_candidate(messages, snapshot)
+        else:
+            sql_query = await self._complete_sql_async(messages)
+            problems = self._validate(sql_query, snapshot)
+        sql_query = await self._repair_async(messages, snapshot, sql_query, problems)
+        logger.info("generated sql for %r: %s", user_query, sql_query)
+        return await self._in_db_executor(self._remember_sql, user_query, sql_query, snapshot.version)
+
+    def repair_sql(self, user_query: str, sql_query: str, problems: list[str]) -> str:
+        snapshot, schema = self._prompt_schema(user_query)
+        return self._repair(self._sql_messages(user_query, schema), snapshot, sql_query, problems)
+
+    async def repair_sql_async(self, user_query: str, sql_query: str, problems: list[str]) -> str:
+        snapshot, schema = await self._in_db_executor(self._prompt_schema, user_query)
+        return await self._repair_async(self._sql_messages(user_query, schema), snapshot, sql_query, problems)
+
+    def _execute_with_repair(self, user_query: str, sql_query: str, params: dict) -> tuple[str, dict, QueryResult]:
+        for attempt in range(self.repair_attempts + 1):
+            try:
+                return sql_query, params, self.execute_query(sql_query, params)
+            except DBAPIError as e:
+                if attempt == self.repair_attempts:
+                    raise
+                record_retry("execute")
+                # the model repairs the literal SQL; the fix replaces the cached entry or template
+                repaired = self.repair_sql(user_query, self.inline_sql(sql_query, params), [f"database error: {e.orig}"])
+                sql_query, params = self._remember_sql(user_query, repaired)
+
+    async def _execute_with_repair_async(self, user_query: str, sql_query: str, params: dict, execute=None) -> tuple[str, dict, QueryResult]:
+        execute = execute or self.execute_query_async
+        for attempt in range(self.repair_attempts + 1):
+            try:
+                return sql_query, params, await execute(sql_query, params)
+            except DBAPIError as e:
+                if attempt == self.repair_attempts:
+                    raise
+                record_retry("execute")
+                repaired = await self.repair_sql_async(user_query, self.inline_sql(sql_query, params), [f"database error: {e.orig}"])
+                sql_query, params = await self._in_db_executor(self._remember_sql, user_query, repaired)
+
+    def _result_messages(self, user_query: str, sql_query: str, db_result: QueryResult):
+        process_result_request: "list[ChatCompletionMessageParam]" = [
+            {
+                "role": "user",
+                "content": f"""You are a helpful assistant.
                             The user asked: {user_query}
                             The SQL query executed: {sql_query}
-                            The DB returned: {db_result}
+                            The DB returned: {result_for_prompt(db_result, self.result_config)}
                             Create a structured and beautiful response for the user."""
-            )
+            }
         ]
-        response = self.client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=process_result_request
-        )
+        return process_result_request
+
+    def process_result(self, user_query: str, sql_query: str, db_result: QueryResult) -> str:
+        with stage("process_result"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._result_messages(user_query, sql_query, db_result)
+            )
+        record_usage("process_result", response.usage)
         return response.choices[0].message.content.strip()
 
-    def run(self, user_query: str) -> str:
-        sql_query = self.generate_sql(user_query)
-        db_result = self.execute_query(sql_query)
-        return self.process_result(user_query, sql_query, db_result)
+    async def process_result_async(self, user_query: str, sql_query: str, db_result: QueryResult) -> str:
+        messages = self._result_messages(user_query, sql_query, db_result)
+        client = await self._llm()
+        reserved = await self.scheduler.acquire(messages)
+        with stage("process_result"):
+            response = await client.chat.completions.create(
+                model=self.model,
+                messages=messages
+            )
+        self.scheduler.settle(reserved, response.usage)
+        record_usage("process_result", response.usage)
+        return response.choices[0].message.content.strip()
+
+    async def stream_result_async(self, user_query: str, sql_query: str, db_result: QueryResult):
+        messages = self._result_messages(user_query, sql_query, db_result)
+        client = await self._llm()
+        reserved = await self.scheduler.acquire(messages)
+        with stage("process_result"):
+            stream = await client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self.scheduler.settle(reserved, chunk.usage)
+                    record_usage("process_result", chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def render_result(self, mode: str | None, db_result: QueryResult) -> tuple[str, str | dict | None]:
+        # returns the resolved mode and the local rendering, or None when the LLM should narrate
+        mode = resolve_mode(mode or self.render_config.default_mode, db_result, self.render_config)
+        if mode == "narrate":
+            return mode, None
+        with stage("render"):
+            if mode == "json":
+                return mode, render_json(db_result)
+            return mode, render_markdown(db_result, self.render_config.max_table_rows)
+
+    def run(self, user_query: str, mode: str | None = None) -> str | dict:
+        sql_query, params = self.generate_sql(user_query)
+        sql_query, params, db_result = self._execute_with_repair(user_query, sql_query, params)
+        _, rendered = self.render_result(mode, db_result)
+        if rendered is not None:
+            return rendered
+        return self.process_result(user_query, self.inline_sql(sql_query, params), db_result)
+
+    async def run_async(self, user_query: str, mode: str | None = None) -> str | dict:
+        sql_query, params = await self.generate_sql_async(user_query)
+        sql_query, params, db_result = await self._execute_with_repair_async(user_query, sql_query, params)
+        _, rendered = self.render_result(mode, db_result)
+        if rendered is not None:
+            return rendered
+        return await self.process_result_async(user_query, self.inline_sql(sql_query, params), db_result)
+
+    async def stream_run(self, user_query: str, mode: str | None = None):
+        sql_query, params = await self.generate_sql_async(user_query)
+        yield "sql", {"sql": self.inline_sql(sql_query, params), "params": params}
+        repaired_sql, params, db_result = await self._execute_with_repair_async(user_query, sql_query, params)
+        if repaired_sql != sql_query:
+            sql_query = repaired_sql
+            yield "sql", {"sql": self.inline_sql(sql_query, params), "params": params}
+        sql_query = self.inline_sql(sql_query, params)
+        mode, rendered = self.render_result(mode, db_result)
+        yield "rows", {"row_count": db_result.row_count, "truncated": db_result.truncated, "mode": mode}
+        if mode == "json":
+            yield "data", rendered
+            return
+        if rendered is not None:
+            yield "token", {"text": rendered}
+            return
+        async for token in self.stream_result_async(user_query, sql_query, db_result):
+            yield "token", {"text": token}
+
+    async def open_rows_async(self, user_query: str) -> tuple[str, dict, RowCursor]:
+        # same SQL path as run_async, but the rows stay behind a server-side cursor for paging
+        async def open_cursor(sql_query: str, params: dict) -> RowCursor:
+            return await self._in_db_executor(self.row_cursors.open, sql_query, params)
+
+        sql_query, params = await self.generate_sql_async(user_query)
+        return await self._execute_with_repair_async(user_query, sql_query, params, open_cursor)
+
+    async def fetch_rows_async(self, cursor_id: str, offset: int, limit: int | None = None):
+        return await self._in_db_executor(self.row_cursors.fetch, cursor_id, offset, limit)
+
+    def close(self):
+        # releases this database's connections and threads; shared LLM clients stay open
+        self.row_cursors.close_all()
+        self.sql_cache.close()
+        self.template_cache.close()
+        self.db_executor.shutdown(wait=False)
+        dispose_engine(self.db_uri)
+
+    async def aclose(self):
+        if self._owns_llm and "async_client" in self.__dict__:
+            await self.async_client.close()
+        self.close()
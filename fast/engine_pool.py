@@ -0,0 +1,134 @@
+# engine_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, text
+
+
+class PoolConfig:
+    def __init__(self, pool_size: int | None = None, max_overflow: int | None = None):
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "5")) if pool_size is None else pool_size
+        self.max_overflow = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")) if max_overflow is None else max_overflow
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.pre_ping = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        self.recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.stmt_cache_size = int(os.getenv("DB_STMT_CACHE_SIZE", "50"))
+        self.warm_up = int(os.getenv("DB_POOL_WARM_UP", "2"))
+
+
+class PooledEngine:
+    def __init__(self, db_uri: str, config: PoolConfig):
+        self.db_uri = db_uri
+        self.config = config
+        self.engine = create_engine(db_uri, **self._engine_kwargs())
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._connects = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        event.listen(self.engine, "checkout", self._on_checkout)
+        event.listen(self.engine, "connect", self._on_connect)
+
+    def _engine_kwargs(self) -> dict:
+        kwargs = {"pool_pre_ping": self.config.pre_ping, "pool_recycle": self.config.recycle}
+        # in-memory sqlite runs on a single-connection pool that takes no sizing args
+        in_memory_sqlite = self.db_uri.startswith("sqlite") and (self.db_uri == "sqlite://" or ":memory:" in self.db_uri)
+        if not in_memory_sqlite:
+            kwargs.update(
+                pool_size=self.config.pool_size,
+                max_overflow=self.config.max_overflow,
+                pool_timeout=self.config.pool_timeout,
+            )
+        if self.db_uri.startswith("oracle"):
+            kwargs["connect_args"] = {"stmtcachesize": self.config.stmt_cache_size}
+        return kwargs
+
+    def _on_checkout(self, dbapi_conn, conn_record, conn_proxy):
+        with self._lock:
+            self._checkouts += 1
+
+    def _on_connect(self, dbapi_conn, conn_record):
+        with self._lock:
+            self._connects += 1
+
+    @contextmanager
+    def connect(self):
+        start = time.perf_counter()
+        conn = self.engine.connect()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._waits += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def warm_up(self, connections: int | None = None):
+        count = self.config.warm_up if connections is None else connections
+        conns = []
+        try:
+            for _ in range(count):
+                conn = self.engine.connect()
+                conn.execute(text("SELECT 1 FROM DUAL" if self.engine.dialect.name == "oracle" else "SELECT 1"))
+                conns.append(conn)
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        with self._lock:
+            stats = {
+                "checkouts": self._checkouts,
+                "connects": self._connects,
+                "total_wait_seconds": round(self._total_wait, 6),
+                "avg_wait_seconds": round(self._total_wait / self._waits, 6) if self._waits else 0.0,
+                "max_wait_seconds": round(self._max_wait, 6),
+            }
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if callable(getattr(pool, name, None)):
+                stats[name] = getattr(pool, name)()
+        stats["status"] = pool.status()
+        return stats
+
+    def dispose(self):
+        self.engine.dispose()
+
+
+_engines: dict[str, PooledEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_pooled_engine(db_uri: str, config: PoolConfig | None = None) -> PooledEngine:
+    with _engines_lock:
+        pooled = _engines.get(db_uri)
+        if pooled is None:
+            pooled = PooledEngine(db_uri, config or PoolConfig())
+            _engines[db_uri] = pooled
+        return pooled
+
+
+def dispose_engine(db_uri: str):
+    with _engines_lock:
+        pooled = _engines.pop(db_uri, None)
+    if pooled is not None:
+        pooled.dispose()
+
+
+def pool_stats() -> dict:
+    with _engines_lock:
+        pooled_engines = list(_engines.values())
+    return {pooled.engine.url.render_as_string(hide_password=True): pooled.stats() for pooled in pooled_engines}
+
+
+def dispose_all():
+    with _engines_lock:
+        pooled_engines = list(_engines.values())
+        _engines.clear()
+    for pooled in pooled_engines:
+        pooled.dispose()
@@ -0,0 +1,111 @@
+# execution_guard.py
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from sql_validator import SQLGLOT_DIALECTS
+
+
+class QueryRejected(Exception):
+    def __init__(self, code: str, message: str, **details):
+        self.code = code
+        self.details = details
+        super().__init__(message)
+
+    def as_dict(self) -> dict:
+        return {"error": str(self), "code": self.code, "details": self.details}
+
+
+class GuardConfig:
+    def __init__(self, row_cap: int):
+        # one row past the result cap, so fetch_bounded can still tell the result was cut off
+        self.row_limit = int(os.getenv("SQL_ROW_LIMIT", str(row_cap + 1)))
+        self.timeout_ms = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "30000"))
+        self.plan_check = os.getenv("SQL_PLAN_CHECK", "false").lower() == "true"
+        self.max_plan_cost = float(os.getenv("SQL_MAX_PLAN_COST", "1000000"))
+        self.max_plan_cardinality = float(os.getenv("SQL_MAX_PLAN_CARDINALITY", "10000000"))
+
+
+class ExecutionGuard:
+    def __init__(self, dialect: str, config: GuardConfig):
+        self.dialect = dialect
+        self.config = config
+
+    def _has_row_limit(self, sql: str) -> bool:
+        try:
+            statement = sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(self.dialect, self.dialect))
+        except Exception:
+            return True
+        if statement.args.get("limit") or statement.args.get("fetch"):
+            return True
+        # Oracle's pre-12c idiom: WHERE ROWNUM <= n on the outer query
+        where = statement.args.get("where")
+        return bool(where and any(col.name.upper() == "ROWNUM" for col in where.find_all(exp.Column)))
+
+    def limit(self, sql: str, row_limit: int | None = None) -> str:
+        row_limit = self.config.row_limit if row_limit is None else row_limit
+        if row_limit <= 0 or self._has_row_limit(sql):
+            return sql
+        if self.dialect == "oracle":
+            return f"{sql}\nFETCH FIRST {row_limit} ROWS ONLY"
+        if self.dialect in ("sqlite", "postgresql", "mysql"):
+            return f"{sql}\nLIMIT {row_limit}"
+        return sql
+
+    def check_plan(self, conn, sql: str, params: dict | None = None):
+        if not self.config.plan_check or self.dialect != "oracle":
+            return
+        statement_id = uuid.uuid4().hex[:30]
+        conn.execute(text(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}"), params or {})
+        cost, cardinality = conn.execute(
+            text("SELECT COST, CARDINALITY FROM PLAN_TABLE WHERE STATEMENT_ID = :sid AND ID = 0"),
+            {"sid": statement_id},
+        ).one()
+        conn.execute(text("DELETE FROM PLAN_TABLE WHERE STATEMENT_ID = :sid"), {"sid": statement_id})
+        conn.commit()
+        if cost is not None and cost > self.config.max_plan_cost:
+            raise QueryRejected(
+                "plan_cost_exceeded", f"Query plan cost {cost} is above the limit of {self.config.max_plan_cost:g}",
+                cost=cost, limit=self.config.max_plan_cost,
+            )
+        if cardinality is not None and cardinality > self.config.max_plan_cardinality:
+            raise QueryRejected(
+                "plan_cardinality_exceeded",
+                f"Query is estimated to touch {cardinality} rows, above the limit of {self.config.max_plan_cardinality:g}",
+                cardinality=cardinality, limit=self.config.max_plan_cardinality,
+            )
+
+    @contextmanager
+    def timeout(self, conn):
+        timeout_ms = self.config.timeout_ms
+        if timeout_ms <= 0:
+            yield
+            return
+        driver_conn = conn.connection.driver_connection
+        if self.dialect == "oracle":
+            driver_conn.call_timeout = timeout_ms
+        elif self.dialect == "sqlite":
+            deadline = time.monotonic() + timeout_ms / 1000
+            driver_conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10_000)
+        start = time.monotonic()
+        try:
+            yield
+        except DBAPIError as e:
+            # drivers word this differently (DPY-4024, ORA-03156, "interrupted"); elapsed time is the reliable signal
+            if (time.monotonic() - start) * 1000 >= timeout_ms * 0.95:
+                raise QueryRejected(
+                    "statement_timeout", f"Query exceeded the statement timeout of {timeout_ms} ms",
+                    timeout_ms=timeout_ms,
+                ) from e
+            raise
+        finally:
+            if self.dialect == "oracle":
+                driver_conn.call_timeout = 0
+            elif self.dialect == "sqlite":
+                driver_conn.set_progress_handler(None, 0)
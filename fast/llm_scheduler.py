@@ -0,0 +1,144 @@
+# llm_scheduler.py
+import asyncio
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import ADMISSIONS, LLM_QUEUE_DEPTH, stage
+from result_summary import estimate_tokens
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"LLM capacity exhausted ({reason}), retry in {self.retry_after}s")
+
+    def as_dict(self) -> dict:
+        return {"error": str(self), "code": self.reason, "retry_after": self.retry_after}
+
+
+def rate_limit_error() -> type[Exception]:
+    # openai is imported with the first LLM client; until then no RateLimitError can have been raised
+    openai = sys.modules.get("openai")
+    return openai.RateLimitError if openai is not None else AdmissionRejected
+
+
+def admission_error(e: Exception) -> AdmissionRejected | None:
+    if isinstance(e, AdmissionRejected):
+        return e
+    if isinstance(e, rate_limit_error()):
+        # the provider throttled us anyway; pass its back-off on to the client
+        return AdmissionRejected("upstream_rate_limit", float(e.response.headers.get("retry-after", "1")))
+    return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        # per_minute <= 0 means unlimited
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        # negative amounts refund over-reservations; the level may go below zero when usage beat the estimate
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level - amount)
+
+
+_deadline: ContextVar[float | None] = ContextVar("llm_deadline", default=None)
+
+
+class LLMScheduler:
+    def __init__(self):
+        self.rpm = TokenBucket(int(os.getenv("LLM_RPM", "0")))
+        self.tpm = TokenBucket(int(os.getenv("LLM_TPM", "0")))
+        self.queue_size = int(os.getenv("LLM_QUEUE_SIZE", "64"))
+        self.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+        self.expected_completion_tokens = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "512"))
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+
+    def is_full(self) -> bool:
+        return 0 < self.queue_size <= self.waiting
+
+    def retry_after(self) -> float:
+        # time for the bucket to admit everyone already queued plus one more request
+        now = time.monotonic()
+        return max(self.rpm.wait_time(self.waiting + 1, now), self.tpm.wait_time(self.expected_completion_tokens, now))
+
+    @contextmanager
+    def request_deadline(self, seconds: float | None = None):
+        # all LLM calls of one request share its deadline instead of each getting a fresh timeout
+        token = _deadline.set(time.monotonic() + (self.queue_timeout if seconds is None else seconds))
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    def estimate(self, messages: list) -> int:
+        prompt = "".join(str(m.get("content", "")) for m in messages)
+        return estimate_tokens(prompt) + self.expected_completion_tokens
+
+    async def acquire(self, messages: list) -> int:
+        if self.is_full():
+            ADMISSIONS.labels("queue_full").inc()
+            raise AdmissionRejected("queue_full", self.retry_after())
+        reserved = self.estimate(messages)
+        deadline = _deadline.get() or time.monotonic() + self.queue_timeout
+        self.waiting += 1
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            with stage("llm_queue"):
+                # the lock keeps admission FIFO: the head of the queue sleeps until the buckets cover it
+                try:
+                    await asyncio.wait_for(self._lock.acquire(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    ADMISSIONS.labels("deadline").inc()
+                    raise AdmissionRejected("deadline", self.retry_after()) from None
+                try:
+                    while True:
+                        now = time.monotonic()
+                        wait = max(self.rpm.wait_time(1, now), self.tpm.wait_time(reserved, now))
+                        if wait == 0:
+                            self.rpm.take(1)
+                            self.tpm.take(reserved)
+                            break
+                        if now + wait > deadline:
+                            ADMISSIONS.labels("deadline").inc()
+                            raise AdmissionRejected("deadline", wait)
+                        await asyncio.sleep(wait)
+                finally:
+                    self._lock.release()
+        finally:
+            self.waiting -= 1
+            LLM_QUEUE_DEPTH.dec()
+        ADMISSIONS.labels("admitted").inc()
+        return reserved
+
+    def settle(self, reserved: int, usage):
+        if usage is not None and usage.total_tokens:
+            self.tpm.take(usage.total_tokens - reserved)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        available = {}
+        for name, bucket in (("rpm_available", self.rpm), ("tpm_available", self.tpm)):
+            bucket.wait_time(0, now)
+            available[name] = None if bucket.capacity <= 0 else round(bucket.level, 2)
+        return {"waiting": self.waiting, "queue_size": self.queue_size, **available}
@@ -0,0 +1,108 @@
+# metrics.py
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+STAGE_SECONDS = Histogram(
+    "dbchat_stage_seconds", "Time spent in each stage of a query", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_TOKENS = Counter("dbchat_llm_tokens_total", "LLM tokens used", ["stage", "kind"])
+ROWS_FETCHED = Counter("dbchat_rows_fetched_total", "Rows fetched from the database")
+RETRIES = Counter("dbchat_retries_total", "Retried operations", ["stage"])
+REQUESTS = Counter("dbchat_requests_total", "Handled queries", ["endpoint", "outcome"])
+CACHE_LOOKUPS = Counter("dbchat_cache_lookups_total", "Cache lookups", ["cache", "outcome"])
+ADMISSIONS = Counter("dbchat_llm_admissions_total", "LLM scheduler admission decisions", ["outcome"])
+LLM_QUEUE_DEPTH = Gauge("dbchat_llm_queue_depth", "Requests waiting for LLM capacity")
+COALESCED = Counter("dbchat_coalesced_requests_total", "Requests answered by an identical in-flight request", ["endpoint"])
+
+
+class RequestTimings:
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.tokens: dict[str, dict[str, int]] = {}
+        self.rows = 0
+        self.retries = 0
+        self.coalesced = False
+
+    def as_dict(self) -> dict:
+        return {
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "tokens": self.tokens,
+            "rows": self.rows,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+        }
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def track_request():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        elapsed = time.perf_counter() - start
+        timings.stages["total"] = elapsed
+        STAGE_SECONDS.labels("total").observe(elapsed)
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.stages[name] = timings.stages.get(name, 0.0) + elapsed
+
+
+def record_usage(stage_name: str, usage):
+    if usage is None:
+        return
+    counts = {"prompt": usage.prompt_tokens or 0, "completion": usage.completion_tokens or 0}
+    timings = _current.get()
+    for kind, count in counts.items():
+        LLM_TOKENS.labels(stage_name, kind).inc(count)
+        if timings is not None:
+            stage_tokens = timings.tokens.setdefault(stage_name, {"prompt": 0, "completion": 0})
+            stage_tokens[kind] += count
+
+
+def record_rows(count: int):
+    ROWS_FETCHED.inc(count)
+    timings = _current.get()
+    if timings is not None:
+        timings.rows += count
+
+
+def record_retry(stage_name: str):
+    RETRIES.labels(stage_name).inc()
+    timings = _current.get()
+    if timings is not None:
+        timings.retries += 1
+
+
+def record_coalesced(endpoint: str):
+    COALESCED.labels(endpoint).inc()
+    timings = _current.get()
+    if timings is not None:
+        timings.coalesced = True
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -17,7 +17,7 @@ def understand_chunks():
     for chunk in chunks:
         print(chunk)
 
-def embeddings():
+def embeddings(count=9):
     from google import genai
     import os
     from dotenv import load_dotenv
@@ -25,11 +25,11 @@ def embeddings():
 
     client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
+    # one batched request instead of one round trip per text
     result = client.models.embed_content(
         model="gemini-embedding-001",
-        contents="What is the meaning of life?")
+        contents=["What is the meaning of life?"] * count)
 
     print(result.embeddings)
 
-for i in range(1,10):
-    embeddings()
\ No newline at end of file
+embeddings()
\ No newline at end of file
@@ -0,0 +1,177 @@
+# result_cache.py
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+
+from result_summary import QueryResult
+from sql_validator import SQLGLOT_DIALECTS
+
+logger = logging.getLogger(__name__)
+
+# results of these change with the clock or on every run, so they are never cached
+NONDETERMINISTIC = re.compile(
+    r"\b(sysdate|systimestamp|current_date|current_timestamp|localtimestamp|now|random|dbms_random|sys_guid)\b",
+    re.IGNORECASE,
+)
+
+
+class ResultTicket:
+    def __init__(self, key: str, tables: tuple[str, ...], fingerprints: dict):
+        self.key = key
+        self.tables = tables
+        self.fingerprints = fingerprints
+
+
+class _Entry:
+    def __init__(self, blob: bytes, tables: tuple[str, ...], fingerprints: dict):
+        self.blob = blob
+        self.tables = tables
+        self.fingerprints = fingerprints
+        self.stored_at = time.monotonic()
+
+
+def _parse_probe_columns(spec: str) -> dict[str, str]:
+    # "payments:created_at,users:updated_at" -> {"payments": "created_at", "users": "updated_at"}
+    columns = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        table, _, column = item.partition(":")
+        columns[table.strip().lower()] = column.strip()
+    return columns
+
+
+class ResultCache:
+    def __init__(self, engine, max_bytes: int | None = None, ttl: float | None = None, probe_interval: float | None = None):
+        self.engine = engine
+        self.dialect = SQLGLOT_DIALECTS.get(engine.dialect.name, engine.dialect.name)
+        self.max_bytes = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) if max_bytes is None else max_bytes
+        self.ttl = float(os.getenv("RESULT_CACHE_TTL", "300")) if ttl is None else ttl
+        self.probe_interval = float(os.getenv("RESULT_CACHE_PROBE_INTERVAL", "5")) if probe_interval is None else probe_interval
+        # tables with a reliable "last changed" column get MAX(column) in their probe alongside COUNT(*)
+        self.probe_columns = _parse_probe_columns(os.getenv("RESULT_CACHE_PROBE_COLUMNS", ""))
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._probes: dict[str, tuple[float, object]] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _analyze(self, sql: str, params: dict | None) -> tuple[str, tuple[str, ...]] | None:
+        if self.max_bytes <= 0 or NONDETERMINISTIC.search(sql):
+            return None
+        try:
+            statement = sqlglot.parse_one(sql, read=self.dialect)
+        except Exception:
+            return None
+        ctes = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+        tables = tuple(sorted({t.name.lower() for t in statement.find_all(exp.Table) if t.name.lower() not in ctes}))
+        canonical = statement.sql(dialect=self.dialect, normalize=True)
+        binds = json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{canonical}\n{binds}".encode("utf-8")).hexdigest(), tables
+
+    def _probe_sql(self, table: str) -> str:
+        quoted = self.engine.dialect.identifier_preparer.quote(table)
+        column = self.probe_columns.get(table)
+        if column:
+            return f"SELECT COUNT(*), MAX({self.engine.dialect.identifier_preparer.quote(column)}) FROM {quoted}"
+        return f"SELECT COUNT(*) FROM {quoted}"
+
+    def _fingerprints(self, tables: tuple[str, ...]) -> dict:
+        now = time.monotonic()
+        fingerprints = {}
+        stale = [t for t in tables if t not in self._probes or now - self._probes[t][0] >= self.probe_interval]
+        if stale:
+            with self.engine.connect() as conn:
+                for table in stale:
+                    try:
+                        value = tuple(conn.execute(text(self._probe_sql(table))).one())
+                    except Exception as e:
+                        # views, DUAL and the like cannot be probed; their entries live until the TTL
+                        logger.debug("cannot probe %s: %s", table, e)
+                        conn.rollback()
+                        value = None
+                    self._probes[table] = (now, value)
+        for table in tables:
+            fingerprints[table] = self._probes[table][1]
+        return fingerprints
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry.blob)
+            self.invalidations += 1
+
+    def lookup(self, sql: str, params: dict | None = None) -> tuple[ResultTicket | None, QueryResult | None]:
+        analyzed = self._analyze(sql, params)
+        if analyzed is None:
+            return None, None
+        key, tables = analyzed
+        fingerprints = self._fingerprints(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry.stored_at >= self.ttl or entry.fingerprints != fingerprints
+            ):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return ResultTicket(key, tables, fingerprints), None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            blob = entry.blob
+        columns, rows, truncated = pickle.loads(zlib.decompress(blob))
+        return None, QueryResult(columns, rows, truncated)
+
+    def store(self, ticket: ResultTicket | None, result: QueryResult):
+        if ticket is None:
+            return
+        # fingerprints were taken before the query ran, so a write that lands mid-query invalidates the entry
+        blob = zlib.compress(pickle.dumps((result.columns, result.rows, result.truncated), pickle.HIGHEST_PROTOCOL), 1)
+        if len(blob) > self.max_bytes // 4:
+            return
+        with self._lock:
+            if ticket.key in self._entries:
+                self.bytes -= len(self._entries.pop(ticket.key).blob)
+            self._entries[ticket.key] = _Entry(blob, ticket.tables, ticket.fingerprints)
+            self.bytes += len(blob)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted.blob)
+
+    def invalidate_tables(self, tables: list[str]):
+        tables = {t.lower() for t in tables}
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if tables.intersection(e.tables)]:
+                self._drop(key)
+            for table in tables:
+                self._probes.pop(table, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._probes.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
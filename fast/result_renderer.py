@@ -0,0 +1,67 @@
+# result_renderer.py
+import os
+
+from result_summary import QueryResult
+
+# auto: render scalars and small tables locally, narrate large results with the LLM
+# narrate: always call the LLM, table: always markdown, json: always raw columns/rows
+RENDER_MODES = ("auto", "narrate", "table", "json")
+
+
+class RenderConfig:
+    def __init__(self):
+        self.default_mode = os.getenv("RENDER_MODE", "auto")
+        self.small_table_rows = int(os.getenv("RENDER_SMALL_TABLE_ROWS", "50"))
+        self.max_table_rows = int(os.getenv("RENDER_MAX_TABLE_ROWS", "200"))
+        if self.default_mode not in RENDER_MODES:
+            raise ValueError(f"RENDER_MODE must be one of {', '.join(RENDER_MODES)}, got {self.default_mode}")
+
+
+def result_shape(result: QueryResult, small_table_rows: int) -> str:
+    if not result.rows:
+        return "empty"
+    if result.row_count == 1 and len(result.columns) == 1:
+        return "scalar"
+    if result.truncated or result.row_count > small_table_rows:
+        return "large_table"
+    return "small_table"
+
+
+def resolve_mode(mode: str, result: QueryResult, config: RenderConfig) -> str:
+    if mode != "auto":
+        return mode
+    return "narrate" if result_shape(result, config.small_table_rows) == "large_table" else "table"
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_markdown(result: QueryResult, max_rows: int) -> str:
+    shape = result_shape(result, max_rows)
+    if shape == "empty":
+        return "The query returned no rows."
+    if shape == "scalar":
+        return f"**{result.columns[0]}**: {_cell(result.rows[0][0])}"
+
+    rows = result.rows[:max_rows]
+    lines = [
+        "| " + " | ".join(_cell(c) for c in result.columns) + " |",
+        "|" + "---|" * len(result.columns),
+        *("| " + " | ".join(_cell(v) for v in row) + " |" for row in rows),
+    ]
+    if len(rows) < result.row_count or result.truncated:
+        total = f"more than {result.row_count}" if result.truncated else str(result.row_count)
+        lines.append(f"\n_Showing {len(rows)} of {total} rows._")
+    return "\n".join(lines)
+
+
+def render_json(result: QueryResult) -> dict:
+    return {
+        "columns": result.columns,
+        "rows": [list(row) for row in result.rows],
+        "row_count": result.row_count,
+        "truncated": result.truncated,
+    }
@@ -0,0 +1,112 @@
+# result_summary.py
+import os
+from decimal import Decimal
+
+import numpy as np
+
+
+def estimate_tokens(text: str) -> int:
+    # rough heuristic (~4 chars per token) that is good enough for budgeting prompts
+    return len(text) // 4 + 1
+
+
+class ResultConfig:
+    def __init__(self):
+        self.arraysize = int(os.getenv("DB_FETCH_ARRAYSIZE", "500"))
+        self.row_cap = int(os.getenv("RESULT_ROW_CAP", "1000"))
+        self.sample_rows = int(os.getenv("RESULT_SAMPLE_ROWS", "20"))
+        self.top_k = int(os.getenv("RESULT_TOP_K", "5"))
+        self.token_budget = int(os.getenv("RESULT_TOKEN_BUDGET", "4000"))
+
+
+class QueryResult:
+    def __init__(self, columns: list[str], rows: list[tuple], truncated: bool):
+        self.columns = columns
+        self.rows = rows
+        self.truncated = truncated
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def fetch_bounded(result, arraysize: int, row_cap: int) -> QueryResult:
+    columns = list(result.keys())
+    rows = []
+    truncated = False
+    while True:
+        batch = result.fetchmany(arraysize)
+        if not batch:
+            break
+        rows.extend(tuple(row) for row in batch)
+        if len(rows) > row_cap:
+            del rows[row_cap:]
+            truncated = True
+            break
+    result.close()
+    return QueryResult(columns, rows, truncated)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def summarize_column(values: list, top_k: int) -> dict:
+    present = [v for v in values if v is not None]
+    summary = {"count": len(present), "nulls": len(values) - len(present)}
+    if not present:
+        return summary
+    if all(_is_number(v) for v in present):
+        arr = np.asarray(present, dtype=np.float64)
+        summary.update(
+            min=float(arr.min()), max=float(arr.max()), sum=float(arr.sum()),
+            mean=float(arr.mean()), std=float(arr.std()),
+            distinct=int(np.unique(arr).size),
+        )
+        return summary
+    as_text = np.asarray([str(v) for v in present], dtype=object)
+    uniques, counts = np.unique(as_text, return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:top_k]
+    summary["distinct"] = int(uniques.size)
+    summary["top"] = [[uniques[i], int(counts[i])] for i in order]
+    try:
+        summary.update(min=str(min(present)), max=str(max(present)))
+    except TypeError:
+        pass
+    return summary
+
+
+def summarize(result: QueryResult, top_k: int) -> dict:
+    columns = list(zip(*result.rows)) if result.rows else [[] for _ in result.columns]
+    return {name: summarize_column(list(values), top_k) for name, values in zip(result.columns, columns)}
+
+
+def _rows_text(result: QueryResult, rows: list[tuple]) -> str:
+    return "\n".join([" | ".join(result.columns)] + [" | ".join(str(v) for v in row) for row in rows])
+
+
+def result_for_prompt(result: QueryResult, config: ResultConfig) -> str:
+    full = _rows_text(result, result.rows)
+    if not result.truncated and estimate_tokens(full) <= config.token_budget:
+        return f"{result.row_count} row(s):\n{full}"
+
+    header = (
+        f"More than {config.row_cap} rows matched; summaries cover the first {result.row_count}."
+        if result.truncated else f"{result.row_count} rows; showing column summaries and a sample."
+    )
+    summary_lines = [f"- {name}: {stats}" for name, stats in summarize(result, config.top_k).items()]
+    sample = result.rows[:config.sample_rows]
+    while True:
+        text = "\n".join([header, "Column summaries:", *summary_lines, f"Sample ({len(sample)} rows):", _rows_text(result, sample)])
+        if estimate_tokens(text) <= config.token_budget or not sample:
+            break
+        sample = sample[:len(sample) // 2]
+    if estimate_tokens(text) > config.token_budget:
+        text = text[:config.token_budget * 4]
+    return text
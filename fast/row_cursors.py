@@ -0,0 +1,205 @@
+# row_cursors.py
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from metrics import record_rows
+
+logger = logging.getLogger(__name__)
+
+
+class CursorNotFound(Exception):
+    def __init__(self, cursor_id: str):
+        self.cursor_id = cursor_id
+        super().__init__(f"Row cursor {cursor_id} does not exist or has expired")
+
+
+class CursorOffsetMismatch(Exception):
+    def __init__(self, cursor_id: str, expected: int, requested: int):
+        self.expected = expected
+        super().__init__(f"Row cursor {cursor_id} is at offset {expected}, not {requested}")
+
+
+class CursorCapacityError(Exception):
+    def __init__(self, max_open: int, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"All {max_open} row cursors are in use; retry in {self.retry_after}s")
+
+
+class RowCursor:
+    def __init__(self, cursor_id: str, conn, result, sql: str):
+        self.id = cursor_id
+        self.conn = conn
+        self.result = result
+        self.sql = sql
+        self.columns = list(result.keys())
+        self.offset = 0
+        self.done = False
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def release(self):
+        # gives the connection back to the pool; the cursor record stays so late readers see done
+        if self.conn is not None:
+            try:
+                self.result.close()
+            finally:
+                self.conn.close()
+                self.conn = None
+                self.result = None
+
+
+class RowCursorRegistry:
+    def __init__(self, pool, guard):
+        self.pool = pool
+        self.guard = guard
+        self.ttl = float(os.getenv("ROW_CURSOR_TTL", "120"))
+        # every open cursor pins a pooled connection, so keep this well below DB_POOL_SIZE
+        self.max_open = int(os.getenv("ROW_CURSOR_MAX", "4"))
+        # at capacity, only cursors nobody has paged for this long are closed to make room; otherwise open() is refused
+        self.idle_seconds = float(os.getenv("ROW_CURSOR_IDLE_SECONDS", "30"))
+        self.page_size = int(os.getenv("ROW_PAGE_SIZE", "500"))
+        self.max_page_size = int(os.getenv("ROW_MAX_PAGE_SIZE", "5000"))
+        self.row_limit = int(os.getenv("ROW_CURSOR_ROW_LIMIT", "1000000"))
+        self._cursors: dict[str, RowCursor] = {}
+        self._opening = 0
+        self._lock = threading.Lock()
+
+    def page_limit(self, limit: int | None) -> int:
+        return max(1, min(limit or self.page_size, self.max_page_size))
+
+    def _reserve(self):
+        # takes a slot for a new cursor; someone still paging keeps theirs, so a full registry refuses instead
+        now = time.monotonic()
+        with self._lock:
+            pinned = sorted((c for c in self._cursors.values() if c.conn is not None), key=lambda c: c.last_used)
+            excess = max(0, len(pinned) + self._opening - self.max_open + 1)
+            idle = [c for c in pinned[:excess] if now - c.last_used >= self.idle_seconds]
+            if len(idle) < excess:
+                # room frees up once the last cursor that would have to go has sat idle long enough
+                last = pinned[excess - 1] if excess <= len(pinned) else None
+                raise CursorCapacityError(self.max_open, last.last_used + self.idle_seconds - now if last else self.idle_seconds)
+            for cursor in idle:
+                del self._cursors[cursor.id]
+            self._opening += 1
+        for cursor in idle:
+            logger.info("closing idle row cursor %s to make room", cursor.id)
+            with cursor.lock:
+                cursor.release()
+
+    def open(self, sql: str, params: dict | None = None) -> RowCursor:
+        self.sweep()
+        self._reserve()
+        try:
+            guarded_sql = self.guard.limit(sql, self.row_limit)
+            conn = self.pool.engine.connect()
+            try:
+                # same plan cost / cardinality gate as execute_query, so paging is not a way around it
+                self.guard.check_plan(conn, guarded_sql, params)
+                with self.guard.timeout(conn):
+                    result = conn.execution_options(stream_results=True, yield_per=self.page_size).execute(
+                        text(guarded_sql), params or {}
+                    )
+            except Exception:
+                conn.close()
+                raise
+            cursor = RowCursor(uuid.uuid4().hex, conn, result, sql)
+            with self._lock:
+                self._cursors[cursor.id] = cursor
+            return cursor
+        finally:
+            with self._lock:
+                self._opening -= 1
+
+    def fetch(self, cursor_id: str, offset: int, limit: int | None = None) -> tuple[RowCursor, list[tuple]]:
+        cursor = self._cursors.get(cursor_id)
+        if cursor is None:
+            raise CursorNotFound(cursor_id)
+        limit = self.page_limit(limit)
+        with cursor.lock:
+            if offset != cursor.offset:
+                raise CursorOffsetMismatch(cursor_id, cursor.offset, offset)
+            rows = []
+            if not cursor.done:
+                try:
+                    with self.guard.timeout(cursor.conn):
+                        rows = [tuple(row) for row in cursor.result.fetchmany(limit)]
+                except Exception:
+                    # a failed or timed-out result cannot be resumed; free its connection now rather than at the TTL
+                    with self._lock:
+                        self._cursors.pop(cursor_id, None)
+                    cursor.release()
+                    raise
+                if len(rows) < limit:
+                    cursor.done = True
+                    cursor.release()
+            cursor.offset += len(rows)
+            cursor.last_used = time.monotonic()
+        record_rows(len(rows))
+        return cursor, rows
+
+    def close(self, cursor_id: str) -> bool:
+        with self._lock:
+            cursor = self._cursors.pop(cursor_id, None)
+        if cursor is None:
+            return False
+        with cursor.lock:
+            cursor.release()
+        return True
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [c.id for c in self._cursors.values() if now - c.last_used >= self.ttl]
+        for cursor_id in expired:
+            self.close(cursor_id)
+        return len(expired)
+
+    def close_all(self):
+        for cursor_id in list(self._cursors):
+            self.close(cursor_id)
+
+    def stats(self) -> dict:
+        return {
+            "cursors": len(self._cursors),
+            "pinned_connections": sum(1 for c in self._cursors.values() if c.conn is not None),
+            "max_open": self.max_open,
+        }
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def columnar_page(cursor: RowCursor, rows: list[tuple], offset: int) -> dict:
+    columns = list(zip(*rows)) if rows else [() for _ in cursor.columns]
+    return {
+        "cursor": cursor.id,
+        "offset": offset,
+        "next_offset": cursor.offset,
+        "done": cursor.done,
+        "columns": cursor.columns,
+        "data": {name: [_json_value(v) for v in values] for name, values in zip(cursor.columns, columns)},
+    }
+
+
+def ndjson_page(cursor: RowCursor, rows: list[tuple], offset: int):
+    # header line, one JSON array per row, trailer with the paging state
+    yield json.dumps({"cursor": cursor.id, "offset": offset, "columns": cursor.columns}) + "\n"
+    for row in rows:
+        yield json.dumps([_json_value(v) for v in row], default=str) + "\n"
+    yield json.dumps({"next_offset": cursor.offset, "done": cursor.done}) + "\n"
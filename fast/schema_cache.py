@@ -0,0 +1,115 @@
+# schema_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+DDL_PROBES = {
+    "oracle": "SELECT MAX(LAST_DDL_TIME) FROM USER_OBJECTS",
+    "sqlite": "PRAGMA schema_version",
+}
+
+
+class SchemaSnapshot:
+    def __init__(self, tables: dict[str, list[str]], foreign_keys: dict[str, list[str]], ddl_marker):
+        self.tables = tables
+        # table -> tables it references, used to pull join partners into pruned prompts
+        self.foreign_keys = foreign_keys
+        self.text = "\n".join([f"{t}: {', '.join(c)}" for t, c in tables.items()])
+        self.version = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:16]
+        self.ddl_marker = ddl_marker
+        self.loaded_at = time.monotonic()
+
+
+class SchemaCache:
+    def __init__(self, engine, ttl: float | None = None, probe_interval: float | None = None,
+                 artifact_path: str | None = None):
+        self.engine = engine
+        self.ttl = float(os.getenv("SCHEMA_CACHE_TTL", "3600")) if ttl is None else ttl
+        self.probe_interval = float(os.getenv("SCHEMA_PROBE_INTERVAL", "10")) if probe_interval is None else probe_interval
+        # snapshot written by build_artifacts.py; replaces the first reflection when the DDL marker still matches
+        self.artifact_path = os.getenv("SCHEMA_ARTIFACT_PATH", "") if artifact_path is None else artifact_path
+        self._snapshot: SchemaSnapshot | None = None
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def _probe(self):
+        probe = DDL_PROBES.get(self.engine.dialect.name)
+        if probe is None:
+            return None
+        with self.engine.connect() as conn:
+            return conn.execute(text(probe)).scalar()
+
+    def _reflect(self, ddl_marker) -> SchemaSnapshot:
+        insp = inspect(self.engine)
+        columns = insp.get_multi_columns()
+        fks = insp.get_multi_foreign_keys()
+        tables = {}
+        foreign_keys = {}
+        for key, cols in sorted(columns.items(), key=lambda item: item[0][1]):
+            tables[key[1]] = [col["name"] for col in cols]
+            foreign_keys[key[1]] = sorted({fk["referred_table"] for fk in fks.get(key, []) if fk["referred_table"]})
+        return SchemaSnapshot(tables, foreign_keys, ddl_marker)
+
+    def _is_stale(self, now: float) -> bool:
+        if self._snapshot is None or now - self._snapshot.loaded_at >= self.ttl:
+            return True
+        if now - self._last_probe < self.probe_interval:
+            return False
+        self._last_probe = now
+        marker = self._probe()
+        # compared as text, because artifact markers went through JSON
+        return marker is not None and str(marker) != str(self._snapshot.ddl_marker)
+
+    def _database_key(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def _load_artifact(self) -> SchemaSnapshot | None:
+        if not self.artifact_path or not os.path.exists(self.artifact_path):
+            return None
+        with open(self.artifact_path) as f:
+            artifact = json.load(f)
+        if artifact.get("database") != self._database_key():
+            logger.info("ignoring schema artifact %s built for another database", self.artifact_path)
+            return None
+        return SchemaSnapshot(artifact["tables"], artifact["foreign_keys"], artifact["ddl_marker"])
+
+    def write_artifact(self, path: str | None = None) -> SchemaSnapshot:
+        path = path or self.artifact_path
+        snapshot = self._reflect(self._probe())
+        artifact = {
+            "database": self._database_key(),
+            "ddl_marker": None if snapshot.ddl_marker is None else str(snapshot.ddl_marker),
+            "version": snapshot.version,
+            "tables": snapshot.tables,
+            "foreign_keys": snapshot.foreign_keys,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(artifact, f)
+        os.replace(tmp_path, path)
+        return snapshot
+
+    def get(self) -> SchemaSnapshot:
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None and self.refreshes == 0:
+                # the probe below still runs, so an artifact older than the last DDL change gets reflected over
+                self._snapshot = self._load_artifact()
+            if self._is_stale(now):
+                self._last_probe = now
+                self._snapshot = self._reflect(self._probe())
+                self.refreshes += 1
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,102 @@
+# schema_pruner.py
+import difflib
+import logging
+import os
+import re
+
+from result_summary import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "by", "with", "and", "or", "me", "give", "show",
+    "list", "find", "get", "what", "which", "who", "how", "many", "much", "is", "are", "that", "have",
+    "has", "made", "most", "top", "all", "each", "per", "from", "their", "there", "do", "does",
+}
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ies", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+def identifier_tokens(name: str) -> set[str]:
+    # USER_PAYMENTS / userPayments / user_payment_id -> {"user", "payment", "id"}
+    parts = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", name).replace("_", " ").lower().split()
+    return {_stem(part) for part in parts}
+
+
+def question_tokens(question: str) -> set[str]:
+    # digits are literals ("top 2"), not identifiers
+    words = re.findall(r"[a-z][a-z0-9]*", question.lower())
+    return {_stem(word) for word in words if word not in STOP_WORDS}
+
+
+class SchemaPruner:
+    def __init__(self, tables: dict[str, list[str]], foreign_keys: dict[str, list[str]]):
+        self.tables = tables
+        self.top_k = int(os.getenv("SCHEMA_PRUNE_TOP_K", "4"))
+        self.max_tables = int(os.getenv("SCHEMA_PRUNE_MAX_TABLES", "10"))
+        self.table_tokens = {table: identifier_tokens(table) for table in tables}
+        self.column_tokens = {table: set().union(*map(identifier_tokens, cols)) if cols else set() for table, cols in tables.items()}
+        self.neighbours = {table: set() for table in tables}
+        for table, referred in foreign_keys.items():
+            for other in referred:
+                if other in self.neighbours and other != table:
+                    self.neighbours[table].add(other)
+                    self.neighbours[other].add(table)
+        self.vocabulary = sorted(set().union(*self.table_tokens.values(), *self.column_tokens.values()))
+        self.full_text = self.render(list(tables))
+
+    def _fuzzy(self, words: set[str]) -> dict[str, set[str]]:
+        # fuzzy-match each question word against the whole identifier vocabulary once, not per table
+        return {
+            word: set(difflib.get_close_matches(word, self.vocabulary, n=5, cutoff=0.85)) - {word}
+            for word in words if len(word) > 3
+        }
+
+    def score(self, table: str, words: set[str], fuzzy: dict[str, set[str]]) -> float:
+        score = 0.0
+        for word in words:
+            close = fuzzy.get(word, set())
+            if word in self.table_tokens[table]:
+                score += 3
+            elif close & self.table_tokens[table]:
+                score += 2
+            if word in self.column_tokens[table]:
+                score += 1
+            elif close & self.column_tokens[table]:
+                score += 0.5
+        return score
+
+    def select(self, question: str) -> list[str]:
+        words = question_tokens(question)
+        fuzzy = self._fuzzy(words)
+        scored = sorted(((self.score(table, words, fuzzy), table) for table in self.tables), key=lambda item: (-item[0], item[1]))
+        hits = [table for score, table in scored[:self.top_k] if score > 0]
+        if not hits:
+            return list(self.tables)
+        selected = list(hits)
+        # pull in join partners of the best matches
+        for table in hits:
+            for partner in sorted(self.neighbours[table]):
+                if len(selected) >= self.max_tables:
+                    break
+                if partner not in selected:
+                    selected.append(partner)
+        return selected
+
+    def render(self, tables: list[str]) -> str:
+        return "\n".join(f"{table}({', '.join(self.tables[table])})" for table in tables)
+
+    def prune(self, question: str) -> str:
+        selected = self.select(question)
+        text = self.render(selected)
+        full_tokens, pruned_tokens = estimate_tokens(self.full_text), estimate_tokens(text)
+        logger.info(
+            "schema pruned to %d/%d tables, ~%d prompt tokens instead of ~%d (saved ~%d)",
+            len(selected), len(self.tables), pruned_tokens, full_tokens, full_tokens - pruned_tokens,
+        )
+        return text
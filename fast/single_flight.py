@@ -0,0 +1,25 @@
+# single_flight.py
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]) -> tuple[object, bool]:
+        # returns the result and whether it came from a call another request had already started
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        task = asyncio.create_task(func())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None) if self._inflight.get(key) is task else None)
+        # shielded so a disconnecting leader does not cancel the work the followers are waiting on
+        return await asyncio.shield(task), False
+
+    def inflight(self) -> int:
+        return len(self._inflight)
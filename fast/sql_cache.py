@@ -0,0 +1,140 @@
+# sql_cache.py
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+QUOTED = re.compile(r"('[^']*'|\"[^\"]*\")")
+# sentence punctuation only: followed by whitespace or the end, so "2.5", "-5" and "!=" are left alone
+SENTENCE_PUNCTUATION = re.compile(r"[.,;:?!]+(?=\s|$)")
+# bump when normalize_question changes, so keys persisted under the old rules are dropped
+KEY_FORMAT = "2"
+
+
+def normalize_question(question: str) -> str:
+    # folds case and whitespace only; operators and signs (< > = ! - % +) change the answer, so they stay,
+    # and quoted values keep their case because 'Alice' and 'alice' may be different rows
+    parts = []
+    for i, part in enumerate(QUOTED.split(question)):
+        parts.append(part if i % 2 else SENTENCE_PUNCTUATION.sub(" ", part.lower()))
+    return " ".join("".join(parts).split())
+
+
+class SQLCache:
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None, path: str | None = None,
+                 table: str = "sql_cache"):
+        self.max_entries = int(os.getenv("SQL_CACHE_SIZE", "1000")) if max_entries is None else max_entries
+        self.ttl = float(os.getenv("SQL_CACHE_TTL", "86400")) if ttl is None else ttl
+        self.path = os.getenv("SQL_CACHE_PATH", "") if path is None else path
+        self.table = table
+        # key -> (sql, stored_at); stored_at is wall clock so TTLs survive restarts
+        self._entries: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._schema_version: str | None = None
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if self.path:
+            self._open_store()
+
+    def _open_store(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "schema_version TEXT, question TEXT, sql TEXT, stored_at REAL, PRIMARY KEY (schema_version, question))"
+        )
+        rows = self._db.execute(
+            f"SELECT schema_version, question, sql, stored_at FROM {self.table} ORDER BY stored_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for version, question, sql, stored_at in reversed(rows):
+            self._entries[(version, question)] = (sql, stored_at)
+        logger.info("loaded %d cached sql entries from %s", len(rows), self.path)
+
+    def _check_version(self, schema_version: str):
+        if schema_version == self._schema_version:
+            return
+        stale = [key for key in self._entries if key[0] != schema_version]
+        for key in stale:
+            del self._entries[key]
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE schema_version != ?", (schema_version,))
+            self._db.commit()
+        if stale:
+            self.invalidations += len(stale)
+            logger.info("schema changed, dropped %d cached sql entries", len(stale))
+        self._schema_version = schema_version
+
+    def _delete(self, key: tuple[str, str]):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE schema_version = ? AND question = ?", key)
+            self._db.commit()
+
+    def get(self, question: str, schema_version: str) -> str | None:
+        if self.max_entries <= 0:
+            return None
+        schema_version = f"{schema_version}/k{KEY_FORMAT}"
+        key = (schema_version, normalize_question(question))
+        with self._lock:
+            self._check_version(schema_version)
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] >= self.ttl:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, question: str, schema_version: str, sql: str):
+        if self.max_entries <= 0:
+            return
+        schema_version = f"{schema_version}/k{KEY_FORMAT}"
+        key = (schema_version, normalize_question(question))
+        stored_at = time.time()
+        with self._lock:
+            self._check_version(schema_version)
+            self._entries[key] = (sql, stored_at)
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", (*key, sql, stored_at))
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self._db is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE schema_version = ? AND question = ?", evicted)
+            if self._db is not None:
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "schema_version": self._schema_version.rsplit("/k", 1)[0] if self._schema_version else None,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
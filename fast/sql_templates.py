@@ -0,0 +1,97 @@
+# sql_templates.py
+import re
+
+import sqlglot
+from sqlglot import exp
+
+from sql_validator import SQLGLOT_DIALECTS
+
+# order matters: dates before bare numbers, so 2024-01-31 is one value and not three
+LITERAL_PATTERNS = [
+    ("date", re.compile(r"\b\d{4}-\d{2}-\d{2}\b")),
+    ("str", re.compile(r"'([^']*)'|\"([^\"]*)\"")),
+    # a leading minus belongs to the number unless it follows a word ("below -5" is -5, "10-20" is not)
+    ("num", re.compile(r"(?<![\w.])(?:-(?=\d))?\d+(?:\.\d+)?(?![\w.]*\w)")),
+]
+
+
+def extract_literals(question: str) -> tuple[str, list]:
+    # "top 10 users since 2024-01-01" -> ("top __num__ users since __date__", [10, "2024-01-01"])
+    found = []
+    for kind, pattern in LITERAL_PATTERNS:
+        for match in pattern.finditer(question):
+            if any(start < match.end() and match.start() < end for start, end, _, _ in found):
+                continue
+            if kind == "str":
+                value = match.group(1) if match.group(1) is not None else match.group(2)
+            elif kind == "num":
+                value = float(match.group()) if "." in match.group() else int(match.group())
+            else:
+                value = match.group()
+            found.append((match.start(), match.end(), kind, value))
+    found.sort()
+    parts = []
+    last = 0
+    for start, end, kind, _ in found:
+        parts.append(question[last:start])
+        parts.append(f" __{kind}__ ")
+        last = end
+    parts.append(question[last:])
+    return "".join(parts), [value for _, _, _, value in found]
+
+
+def bind_params(values: list) -> dict:
+    return {f"p{i}": value for i, value in enumerate(values)}
+
+
+def _matches(node: exp.Expression, value) -> bool:
+    # node is a literal or a negated numeric literal; -5 in SQL parses as Neg(Literal(5))
+    if isinstance(node, exp.Neg):
+        return not isinstance(value, str) and _matches(node.this, -value)
+    if node.is_string:
+        return isinstance(value, str) and node.this == value
+    if isinstance(value, str):
+        return False
+    try:
+        return float(node.this) == float(value)
+    except ValueError:
+        return False
+
+
+def parameterize(sql: str, values: list, dialect: str) -> str | None:
+    # every literal from the question must map to exactly one literal in the SQL, otherwise the
+    # template could bind a new value into the wrong place; those questions are cached verbatim instead
+    if not values or len(set(map(repr, values))) != len(values):
+        return None
+    read = SQLGLOT_DIALECTS.get(dialect, dialect)
+    try:
+        statement = sqlglot.parse_one(sql, read=read)
+    except Exception:
+        return None
+    negated = [neg for neg in statement.find_all(exp.Neg) if isinstance(neg.this, exp.Literal) and neg.this.is_number]
+    # a literal under a minus is only ever matched together with its sign
+    literals = [lit for lit in statement.find_all(exp.Literal) if not isinstance(lit.parent, exp.Neg)] + negated
+    targets = []
+    for i, value in enumerate(values):
+        matches = [literal for literal in literals if _matches(literal, value)]
+        if len(matches) != 1:
+            return None
+        targets.append((i, matches[0]))
+    for i, literal in targets:
+        literal.replace(exp.Placeholder(this=f"p{i}"))
+    return statement.sql(dialect=read)
+
+
+def inline(sql: str, params: dict, dialect: str) -> str:
+    # readable SQL for prompts and the UI; execution always goes through the bind variables
+    if not params:
+        return sql
+    read = SQLGLOT_DIALECTS.get(dialect, dialect)
+    statement = sqlglot.parse_one(sql, read=read)
+    for placeholder in list(statement.find_all(exp.Placeholder)):
+        value = params.get(placeholder.name)
+        if value is None:
+            continue
+        literal = exp.Literal.string(value) if isinstance(value, str) else exp.Literal.number(value)
+        placeholder.replace(literal)
+    return statement.sql(dialect=read)
@@ -0,0 +1,109 @@
+# sql_validator.py
+import re
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlglot.optimizer.scope import traverse_scope
+
+# sqlalchemy dialect name -> sqlglot dialect name
+SQLGLOT_DIALECTS = {"oracle": "oracle", "sqlite": "sqlite", "postgresql": "postgres", "mysql": "mysql", "mssql": "tsql"}
+BUILTIN_TABLES = {"dual"}
+# Oracle pseudo-columns look like bare column names but belong to no table
+ORACLE_PSEUDO_COLUMNS = {"rownum", "rowid", "level", "ora_rowscn", "user"}
+
+
+def _is_pseudo_column(name: str, dialect: str) -> bool:
+    return dialect == "oracle" and (name in ORACLE_PSEUDO_COLUMNS or name.startswith("connect_by_"))
+
+
+class SQLValidationError(Exception):
+    def __init__(self, sql: str, problems: list[str]):
+        self.sql = sql
+        self.problems = problems
+        super().__init__(f"Generated SQL is invalid: {'; '.join(problems)}")
+
+
+def clean_sql(sql: str) -> str:
+    # models still wrap SQL in fences or add a trailing semicolon now and then
+    sql = re.sub(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$", "", sql.strip())
+    return sql.strip().rstrip(";").strip()
+
+
+def _real_sources(scope) -> tuple[dict[str, str], bool]:
+    real_sources = {}
+    has_derived = False
+    for alias, source in scope.sources.items():
+        if isinstance(source, exp.Table):
+            real_sources[alias.lower()] = source.name.lower()
+        else:
+            has_derived = True
+    return real_sources, has_derived
+
+
+def _check_scope(scope, tables: dict[str, set[str]], dialect: str = "oracle") -> list[str]:
+    problems = []
+    real_sources, has_derived = _real_sources(scope)
+    # correlated subqueries may reference tables of the enclosing queries
+    outer_sources = {}
+    parent = scope.parent
+    while parent is not None:
+        parent_sources, parent_derived = _real_sources(parent)
+        outer_sources = {**parent_sources, **outer_sources}
+        has_derived = has_derived or parent_derived
+        parent = parent.parent
+    visible_sources = {**outer_sources, **real_sources}
+    select_aliases = set()
+    if isinstance(scope.expression, exp.Select):
+        select_aliases = {e.alias.lower() for e in scope.expression.expressions if isinstance(e, exp.Alias)}
+
+    for column in scope.columns:
+        if column.find_ancestor(exp.Query) is not scope.expression:
+            # columns inside nested queries are checked by their own scope
+            continue
+        name = column.name.lower()
+        if not name or name == "*":
+            continue
+        if not column.table and _is_pseudo_column(name, dialect):
+            continue
+        if column.table:
+            table = visible_sources.get(column.table.lower())
+            if table in tables and name not in tables[table]:
+                problems.append(f"column {column.table}.{column.name} does not exist in table {table}")
+            continue
+        if has_derived or name in select_aliases:
+            continue
+        known = [t for t in visible_sources.values() if t in tables]
+        if known and not any(name in tables[t] for t in known):
+            problems.append(f"column {column.name} does not exist in {', '.join(sorted(set(known)))}")
+    return problems
+
+
+def validate_sql(sql: str, schema: dict[str, list[str]], dialect: str = "oracle") -> list[str]:
+    read = SQLGLOT_DIALECTS.get(dialect, dialect)
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=read) if s is not None]
+    except ParseError as e:
+        return [f"syntax error: {e.errors[0]['description'] if e.errors else e}"]
+    if len(statements) != 1:
+        return [f"expected exactly one statement, got {len(statements)}"]
+    statement = statements[0]
+    if not isinstance(statement, exp.Query):
+        return [f"only queries are allowed, got {statement.key.upper()}"]
+
+    tables = {table.lower(): {col.lower() for col in cols} for table, cols in schema.items()}
+    cte_names = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+    problems = []
+    for table in statement.find_all(exp.Table):
+        name = table.name.lower()
+        if name and name not in tables and name not in cte_names and name not in BUILTIN_TABLES:
+            problems.append(f"table {table.name} does not exist")
+    if problems:
+        return problems
+    try:
+        for scope in traverse_scope(statement):
+            problems.extend(_check_scope(scope, tables, dialect))
+    except Exception:
+        # scope analysis is best effort; the database still has the final word
+        pass
+    return list(dict.fromkeys(problems))
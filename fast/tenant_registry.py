@@ -0,0 +1,181 @@
+# tenant_registry.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from db_chat_utility import DBChatUtility
+from engine_pool import PoolConfig
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownDatabase(Exception):
+    def __init__(self, database_id: str):
+        self.database_id = database_id
+        super().__init__(f"Unknown database id: {database_id}")
+
+
+class TenantCapacityError(Exception):
+    def __init__(self, database_id: str):
+        self.database_id = database_id
+        super().__init__(f"No connection capacity left to open database {database_id}; all open databases are busy")
+
+
+class Tenant:
+    def __init__(self, chat: DBChatUtility):
+        self.chat = chat
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def capacity(self) -> int:
+        return self.chat.pool.config.pool_size + self.chat.pool.config.max_overflow
+
+    def is_idle(self) -> bool:
+        return self.active == 0 and self.chat.row_cursors.stats()["pinned_connections"] == 0
+
+
+class TenantRegistry:
+    def __init__(self, default: DBChatUtility):
+        self.default = default
+        self.max_connections = int(os.getenv("TENANT_MAX_CONNECTIONS", "100"))
+        self.max_tenants = int(os.getenv("TENANT_MAX_OPEN", "32"))
+        self.idle_seconds = float(os.getenv("TENANT_IDLE_SECONDS", "600"))
+        self.pool_config = PoolConfig(
+            pool_size=int(os.getenv("TENANT_POOL_SIZE", "2")),
+            max_overflow=int(os.getenv("TENANT_POOL_MAX_OVERFLOW", "3")),
+        )
+        self.databases = self._load_databases()
+        self._tenants: OrderedDict[str, Tenant] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _load_databases(self) -> dict[str, str]:
+        # DATABASES_FILE is a JSON object of id -> SQLAlchemy URI; DB_URI_<ID> env vars add to or override it
+        databases = {}
+        path = os.getenv("DATABASES_FILE", "")
+        if path:
+            with open(path) as f:
+                databases.update(json.load(f))
+        for name, value in os.environ.items():
+            if name.startswith("DB_URI_") and value:
+                databases[name[len("DB_URI_"):].lower()] = value
+        return databases
+
+    def resolve_uri(self, database_id: str) -> str:
+        uri = self.databases.get(database_id) or self.databases.get(database_id.lower())
+        if uri is None:
+            raise UnknownDatabase(database_id)
+        return uri
+
+    def _connections_in_use(self) -> int:
+        default = self.default.pool.config
+        return default.pool_size + default.max_overflow + sum(t.capacity for t in self._tenants.values())
+
+    def _evict(self, key: str) -> Tenant:
+        # only unregisters; the caller closes it after releasing the lock, since disposing an engine can block
+        tenant = self._tenants.pop(key)
+        self.evictions += 1
+        logger.info("closing idle database %s", tenant.chat.database_id)
+        return tenant
+
+    @staticmethod
+    def _close(tenants: list[Tenant]):
+        for tenant in tenants:
+            try:
+                tenant.chat.close()
+            except Exception:
+                logger.exception("closing database %s failed", tenant.chat.database_id)
+
+    def _make_room(self, capacity: int, evicted: list[Tenant]) -> bool:
+        # least recently used first; databases with requests or open row cursors are never closed
+        for key in [k for k, t in self._tenants.items() if t.is_idle()]:
+            if len(self._tenants) < self.max_tenants and self._connections_in_use() + capacity <= self.max_connections:
+                break
+            evicted.append(self._evict(key))
+        return len(self._tenants) < self.max_tenants and self._connections_in_use() + capacity <= self.max_connections
+
+    def _acquire(self, database_id: str, evicted: list[Tenant]) -> Tenant:
+        uri = self.resolve_uri(database_id)
+        with self._lock:
+            # ids that point at the same database share one pool
+            tenant = self._tenants.get(uri)
+            if tenant is None:
+                capacity = self.pool_config.pool_size + self.pool_config.max_overflow
+                if not self._make_room(capacity, evicted):
+                    raise TenantCapacityError(database_id)
+                tenant = Tenant(DBChatUtility(uri, database_id, self.pool_config, shared=self.default))
+                self._tenants[uri] = tenant
+            self._tenants.move_to_end(uri)
+            tenant.active += 1
+            tenant.last_used = time.monotonic()
+            return tenant
+
+    def is_default(self, database_id: str | None) -> bool:
+        # ids that alias DB_URI are served by the default instance, not a second pool on the same database
+        if not database_id or database_id == "default":
+            return True
+        uri = self.databases.get(database_id) or self.databases.get(database_id.lower())
+        return uri == self.default.db_uri
+
+    @asynccontextmanager
+    async def use(self, database_id: str | None):
+        if self.is_default(database_id):
+            yield self.default
+            return
+        evicted = []
+        try:
+            tenant = self._acquire(database_id, evicted)
+        finally:
+            # evicted even when the new database did not fit; their engines are disposed off the event loop
+            if evicted:
+                await self.default._in_db_executor(self._close, evicted)
+        try:
+            yield tenant.chat
+        finally:
+            with self._lock:
+                tenant.active -= 1
+                tenant.last_used = time.monotonic()
+
+    def get(self, database_id: str | None) -> DBChatUtility | None:
+        # already-open database without pinning it, for follow-up calls such as row paging
+        if self.is_default(database_id):
+            return self.default
+        with self._lock:
+            tenant = self._tenants.get(self.resolve_uri(database_id))
+        return tenant.chat if tenant is not None else None
+
+    def sweep(self) -> int:
+        with self._lock:
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            tenant.chat.row_cursors.sweep()
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, t in self._tenants.items() if t.is_idle() and now - t.last_used >= self.idle_seconds]
+            evicted = [self._evict(key) for key in expired]
+        self._close(evicted)
+        return len(evicted)
+
+    def close_all(self):
+        with self._lock:
+            evicted = [self._evict(key) for key in list(self._tenants)]
+        self._close(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._tenants),
+                "max_open": self.max_tenants,
+                "connections_reserved": self._connections_in_use(),
+                "max_connections": self.max_connections,
+                "evictions": self.evictions,
+                "databases": {
+                    t.chat.database_id: {"active": t.active, "idle_seconds": round(time.monotonic() - t.last_used, 1)}
+                    for t in self._tenants.values()
+                },
+            }
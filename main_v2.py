@@ -1,7 +1,9 @@
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, text
+from fast.schema_cache import SchemaCache
+from rag.conversation import ConversationWindow
 
 load_dotenv()
 
@@ -17,30 +19,26 @@ def format_print(key: str, value: str):
     print("=".center(20, "="), end="\n\n")
 
 
+engine = create_engine(os.getenv("DB_URI"))
+schema_cache = SchemaCache(engine)
+
+
 def get_schema_info():
-    engine = create_engine(os.getenv("DB_URI"))
-    insp = inspect(engine)
-    schema = {}
-    for table in insp.get_table_names():
-        cols = [col["name"] for col in insp.get_columns(table)]
-        schema[table] = cols
-    schema_text = "\n".join([f"{t}: {', '.join(c)}" for t, c in schema.items()])
-    return schema_text
+    return schema_cache.get().text
 
 
 def execute_query(query):
-    engine = create_engine(os.getenv("DB_URI"))
     with engine.connect() as conn:
         result = conn.execute(text(query))
         rows = result.fetchall()
     return rows
 
-chat = []
+# one system prompt plus a token-budgeted history; old DB results get compacted first
+chat = ConversationWindow()
 
-while(True):
-    user_query = input("User : ")
 
-    application_prompt = {"role": "system", "content": f"""You are an expert Oracle SQL assistant. The database you are working on is oracle db.
+def application_prompt():
+    return f"""You are an expert Oracle SQL assistant. The database you are working on is oracle db.
                         Use only the provided database schema to answer queries.
                         STRICT OUTPUT RULES:
                         - Output ONLY raw SQL text.
@@ -57,18 +55,21 @@ while(True):
                             ```
     
                         Below is the oracle db schema :\n {get_schema_info()}
-                        """}
+                        """
+
+
+while(True):
+    user_query = input("User : ")
 
-    user_prompt = {"role" : "user", "content" : user_query}
-    chat.append(application_prompt)
-    chat.append(user_prompt)
+    chat.set_system(application_prompt())
+    chat.add("user", user_query)
     response = client.chat.completions.create(
         model="gemini-2.5-flash",
-        messages=chat,
+        messages=chat.messages,
     )
     sql_query = response.choices[0].message.content
 
-    chat.append({"role": "assistant", "content": sql_query})
+    chat.add("assistant", sql_query)
 
     # format_print("Generate query :", sql_query)
 
@@ -87,14 +88,14 @@ while(True):
                                 This is the result from db: {db_result}
                                 Your task is to create a beautiful well structured response for the user"""
 
-    chat.append({"role":"user", "content": process_result_query})
+    chat.add("user", process_result_query, summary=f"The user asked: {user_query}. The SQL returned {len(db_result)} row(s).")
     # print("\n\n\n", chat, "\n\n\n")
 
     result_response = client.chat.completions.create(
         model="gemini-2.5-flash",
-        messages=chat
+        messages=chat.messages
     )
-    chat.append({"role":"assistant", "content": result_response.choices[0].message.content})
+    chat.add("assistant", result_response.choices[0].message.content)
 
 
     print("assistant : ",result_response.choices[0].message.content)
\ No newline at end of file
@@ -0,0 +1,54 @@
+# conversation.py
+import os
+
+
+def count_tokens(text: str) -> int:
+    # rough heuristic (~4 chars per token); good enough to keep the window under budget
+    return len(text) // 4 + 1
+
+
+class ConversationWindow:
+    def __init__(self, system_prompt: str = "", token_budget: int | None = None, keep_recent: int | None = None):
+        self.token_budget = int(os.getenv("CHAT_TOKEN_BUDGET", "8000")) if token_budget is None else token_budget
+        # the most recent messages are never compacted or dropped
+        self.keep_recent = int(os.getenv("CHAT_KEEP_RECENT", "4")) if keep_recent is None else keep_recent
+        self.system = {"role": "system", "content": system_prompt}
+        self.history: list[dict] = []
+        self.compacted = 0
+        self.dropped = 0
+
+    @property
+    def messages(self) -> list[dict]:
+        return [{"role": self.system["role"], "content": self.system["content"]}] + [
+            {"role": m["role"], "content": m["content"]} for m in self.history
+        ]
+
+    def set_system(self, content: str):
+        self.system["content"] = content
+        self._fit()
+
+    def add(self, role: str, content: str, summary: str | None = None):
+        # messages with a summary (e.g. raw DB results) are compacted to it first when over budget
+        self.history.append({"role": role, "content": content, "summary": summary, "tokens": count_tokens(content)})
+        self._fit()
+
+    def total_tokens(self) -> int:
+        return count_tokens(self.system["content"]) + sum(m["tokens"] for m in self.history)
+
+    def _fit(self):
+        older = len(self.history) - self.keep_recent
+        for message in self.history[:max(older, 0)]:
+            if self.total_tokens() <= self.token_budget:
+                return
+            if message["summary"] is not None:
+                message["content"] = message["summary"]
+                message["tokens"] = count_tokens(message["summary"])
+                message["summary"] = None
+                self.compacted += 1
+        while self.total_tokens() > self.token_budget and len(self.history) > self.keep_recent:
+            self.history.pop(0)
+            self.dropped += 1
+        # don't leave an assistant reply without the user turn that prompted it
+        while self.history and self.history[0]["role"] == "assistant" and len(self.history) > self.keep_recent:
+            self.history.pop(0)
+            self.dropped += 1
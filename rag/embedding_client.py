@@ -0,0 +1,52 @@
+# embedding_client.py
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RETRYABLE_CODES = {429, 500, 503}
+
+
+class EmbeddingClient:
+    def __init__(self, client=None, model: str = "gemini-embedding-001"):
+        if client is None:
+            # google.genai is slow to import and only needed once something has to be embedded
+            from google import genai
+            base_url = os.getenv("EMBEDDING_BASE_URL")
+            client = genai.Client(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                http_options={"base_url": base_url} if base_url else None,
+            )
+        self.client = client
+        self.model = model
+        self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        self.max_concurrency = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+        self.max_retries = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+        self.backoff = float(os.getenv("EMBEDDING_BACKOFF_SECONDS", "1"))
+        self.retries = 0
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        from google.genai import errors
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.models.embed_content(model=self.model, contents=batch)
+                return [embedding.values for embedding in response.embeddings]
+            except errors.APIError as e:
+                if e.code not in RETRYABLE_CODES or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                # exponential backoff with jitter so concurrent batches don't retry in lockstep
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                # map keeps batch order, so vectors line up with the input texts
+                results = list(executor.map(self._embed_batch, batches))
+        return [vector for batch in results for vector in batch]
+
+    def embed_one(self, text: str) -> list[float]:
+        return self.embed([text])[0]
@@ -0,0 +1,49 @@
+# embedding_store.py
+import hashlib
+import os
+
+import numpy as np
+
+
+def content_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        self.vectors: dict[str, np.ndarray] = {}
+        self.reused = 0
+        self.recomputed = 0
+        self._live: list[str] | None = None
+        if os.path.exists(path):
+            data = np.load(path, allow_pickle=False)
+            self.vectors = dict(zip(data["hashes"].tolist(), data["vectors"]))
+
+    def embed(self, texts: list[str], embed_fn) -> list[np.ndarray]:
+        # embed_fn receives only the texts whose hash is not stored yet, in order
+        hashes = [content_hash(self.model, text) for text in texts]
+        missing = list(dict.fromkeys(h for h in hashes if h not in self.vectors))
+        if missing:
+            by_hash = dict(zip(hashes, texts))
+            new_vectors = embed_fn([by_hash[h] for h in missing])
+            for h, vector in zip(missing, new_vectors):
+                self.vectors[h] = np.asarray(vector, dtype=np.float32)
+        self.recomputed += len(missing)
+        self.reused += len(hashes) - len(missing)
+        self._live = hashes
+        return [self.vectors[h] for h in hashes]
+
+    def save(self):
+        # only keep what the last embed() call used, so dropped tables don't pile up on disk
+        live = list(dict.fromkeys(self._live if self._live is not None else self.vectors))
+        self.vectors = {h: self.vectors[h] for h in live}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        vectors = np.stack([self.vectors[h] for h in live]) if live else np.zeros((0, 0), dtype=np.float32)
+        np.savez(tmp_path, hashes=np.array(live, dtype=str), vectors=vectors)
+        os.replace(tmp_path, self.path)
+
+    def report(self) -> str:
+        return f"embeddings: {self.reused} reused, {self.recomputed} recomputed ({len(self.vectors)} stored)"
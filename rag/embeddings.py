@@ -1,145 +1,46 @@
 import os
+import threading
+from functools import cached_property
+
 from dotenv import load_dotenv
-from google import genai
-from sqlalchemy import create_engine, inspect
-
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-load_dotenv()
-
-engine = create_engine(os.getenv("DB_URI"))
-insp = inspect(engine)
-
-schema = {}
-
-# Format into readable text for embeddings
-def schema_to_text(schema_dict):
-    text_parts = []
-    for table, info in schema_dict.items():
-        text_parts.append(f"Table: {table}")
-        for col in info["columns"]:
-            text_parts.append(
-                f"  - Column '{col['name']}' ({col['type']}), "
-                f"{'NULL allowed' if col['nullable'] else 'NOT NULL'}"
-                + (f", default: {col['default']}" if col['default'] else "")
-            )
-        if info["primary_keys"]:
-            text_parts.append(f"  Primary Keys: {', '.join(info['primary_keys'])}")
-        text_parts.append('\n')
-        for fk in info["foreign_keys"]:
-            text_parts.append(
-                f"  Foreign Key: {fk['column']} → {fk['referred_table']}({fk['referred_columns']})"
-            )
-        if info["indexes"]:
-            for idx in info["indexes"]:
-                text_parts.append(
-                    f"  Index: {idx['name']} on {idx['columns']} "
-                    f"{'(unique)' if idx['unique'] else ''}"
-                )
-        text_parts.append("")
-    return "\n".join(text_parts)
-
-# pull data from db
-for table_name in insp.get_table_names():
-    table_info = {"columns": [], "primary_keys": [], "foreign_keys": [], "indexes": []}
-
-    # Columns info
-    for col in insp.get_columns(table_name):
-        table_info["columns"].append({
-            "name": col["name"],
-            "type": str(col["type"]),
-            "nullable": col["nullable"],
-            "default": col.get("default")
-        })
-
-    # Primary keys
-    table_info["primary_keys"] = insp.get_pk_constraint(table_name).get("constrained_columns", [])
-
-    # Foreign keys
-    fks = insp.get_foreign_keys(table_name)
-    for fk in fks:
-        table_info["foreign_keys"].append({
-            "column": fk["constrained_columns"],
-            "referred_table": fk["referred_table"],
-            "referred_columns": fk["referred_columns"]
-        })
-
-    # Indexes
-    for idx in insp.get_indexes(table_name):
-        table_info["indexes"].append({
-            "name": idx["name"],
-            "columns": idx["column_names"],
-            "unique": idx.get("unique", False)
-        })
-
-    schema[table_name] = table_info
-
-# convert schema to text
-schema_str = schema_to_text(schema)
-
-# create chunk config
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,   # you can tune this
-    chunk_overlap=50, # slight overlap helps retain context
-)
-
-# create chunks
-chunks = text_splitter.split_text(schema_str)
-
-# creat gemini client
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-# we'll store embeddings
-embeddings = []
-texts = []
-# pass chunks to llm to create embedding
-for chunk in chunks:
-    response = client.models.embed_content(
-        model="gemini-embedding-001",  # Gemini embedding model
-        contents=chunk
+from sqlalchemy import create_engine, text
+
+from conversation import ConversationWindow
+from embedding_client import EmbeddingClient
+from embedding_store import EmbeddingStore
+from retriever import SchemaRetriever, foreign_key_graph
+from schema_extractor import ddl_marker, extract_schema, schema_to_text
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def build_index(engine, embedding_client: EmbeddingClient, store_path: str, index_path: str) -> SchemaRetriever:
+    # taken before reading the schema, so DDL that lands in between makes the next start rebuild
+    marker = ddl_marker(engine)
+    # pull data from db
+    schema = extract_schema(engine)
+
+    # one chunk per table, so retrieval returns whole tables and an unchanged table always yields the same chunk
+    tables = list(schema)
+    texts = [schema_to_text({table_name: schema[table_name]}) for table_name in tables]
+
+    # embeddings are cached on disk by chunk content, only new or changed chunks hit the api
+    store = EmbeddingStore(store_path, model=EMBEDDING_MODEL)
+    embeddings = store.embed(texts, embedding_client.embed)
+    store.save()
+    print(store.report())
+
+    # in-process top-k over a normalized float32 matrix, expanded along FK edges to pull in join partners
+    retriever = SchemaRetriever(tables, texts, embeddings, foreign_key_graph(schema))
+    retriever.save(
+        index_path, database=engine.url.render_as_string(hide_password=True), model=EMBEDDING_MODEL, ddl_marker=marker,
     )
-    # extract embedding from response and store
-    texts.append(chunk)
-    embeddings.append(response.embeddings[0].values)
-
-
-import chromadb
-db_client = chromadb.Client()
-collection = db_client.create_collection(name="db_schema")
-
-ids = [str(i) for i in range(len(embeddings))]
-
-# Add embeddings to Chroma
-collection.add(ids=ids, embeddings=embeddings, documents=texts)
-
-# Take user query
-user_query = input("User: ")
-query_response = client.models.embed_content(
-model="gemini-embedding-001",
-contents=user_query,
-)
-query_vector = query_response.embeddings[0].values
-
-query_results = collection.query(query_embeddings=[query_vector], n_results=4)
+    return retriever
 
 
-def execute_query(query):
-    from sqlalchemy import text
-    with engine.connect() as conn:
-        result = conn.execute(text(query))
-        rows = result.fetchall()
-    return rows
-
-
-## Let's now start the chat
-from openai import OpenAI
-client = OpenAI(
-    api_key=os.getenv("GEMINI_API_KEY"),
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
-chat = []
-
-application_prompt = {"role": "system", "content": f"""You are an expert Oracle SQL assistant. The database you are working on is oracle db.
+def application_prompt(schema_context):
+    return f"""You are an expert Oracle SQL assistant. The database you are working on is oracle db.
                         Use only the provided database schema to answer queries.
                         STRICT OUTPUT RULES:
                         - Output ONLY raw SQL text.
@@ -155,47 +56,102 @@ application_prompt = {"role": "system", "content": f"""You are an expert Oracle
                             SELECT * FROM users;
                             ```
 
-                        Below is the oracle db schema :\n {query_results}
-                        """}
-
-chat.append(application_prompt)
-
-while (True):
-    user_query = input("User : ")
-
-    user_prompt = {"role": "user", "content": user_query}
-
-    chat.append(user_prompt)
-    response = client.chat.completions.create(
-        model="gemini-2.5-flash",
-        messages=chat,
-    )
-    sql_query = response.choices[0].message.content
-
-    chat.append({"role": "assistant", "content": sql_query})
-
-    # format_print("Generate query :", sql_query)
-
-    db_result = execute_query(sql_query)
-
-    # print(db_result)
-
-    # chat.append(ChatCompletionSystemMessageParam(role="system", content=str(db_result)))
-
-    process_result_query = f"""You are a helpful assistant. 
+                        Below is the oracle db schema :\n {schema_context}
+                        """
+
+
+class RagChat:
+    # everything expensive is built on first use; the index comes from build_artifacts.py when it exists
+    def __init__(self):
+        load_dotenv()
+        self.index_path = os.getenv("RAG_INDEX_PATH", os.path.join(CACHE_DIR, "schema_index.npz"))
+        self.store_path = os.getenv("EMBEDDING_STORE_PATH", os.path.join(CACHE_DIR, "schema_embeddings.npz"))
+        # one system prompt plus a token-budgeted history; old DB results get compacted first
+        self.chat = ConversationWindow()
+
+    @cached_property
+    def engine(self):
+        return create_engine(os.getenv("DB_URI"))
+
+    @cached_property
+    def embedding_client(self) -> EmbeddingClient:
+        # creat gemini embedding client (batched, concurrent, retries on rate limits)
+        return EmbeddingClient(model=EMBEDDING_MODEL)
+
+    @cached_property
+    def retriever(self) -> SchemaRetriever:
+        if os.path.exists(self.index_path):
+            retriever, metadata = SchemaRetriever.load(self.index_path)
+            # without a DDL marker (dialects with no probe) the index cannot be trusted and is rebuilt;
+            # the embedding store still keeps that rebuild to the tables that actually changed
+            marker = ddl_marker(self.engine)
+            if metadata.get("database") == self.engine.url.render_as_string(hide_password=True) \
+                    and metadata.get("model") == EMBEDDING_MODEL \
+                    and marker is not None and metadata.get("ddl_marker") == marker:
+                return retriever
+        return build_index(self.engine, self.embedding_client, self.store_path, self.index_path)
+
+    @cached_property
+    def client(self):
+        from openai import OpenAI
+        return OpenAI(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+        )
+
+    def warm_up(self):
+        self.retriever
+        self.embedding_client
+        self.client
+
+    def execute_query(self, query):
+        with self.engine.connect() as conn:
+            result = conn.execute(text(query))
+            rows = result.fetchall()
+        return rows
+
+    def ask(self, user_query: str) -> str:
+        # retrieve the tables relevant to this question and swap them into the system prompt
+        self.chat.set_system(application_prompt(self.retriever.context(self.embedding_client.embed_one(user_query), k=4)))
+
+        self.chat.add("user", user_query)
+        response = self.client.chat.completions.create(
+            model="gemini-2.5-flash",
+            messages=self.chat.messages,
+        )
+        sql_query = response.choices[0].message.content
+
+        self.chat.add("assistant", sql_query)
+
+        db_result = self.execute_query(sql_query)
+
+        process_result_query = f"""You are a helpful assistant.
                                 Your task is to process user query and provide them response.
                                 A user has asked you this question: {user_query}
                                 DBA executed this sql query : {sql_query}
                                 This is the result from db: {db_result}
                                 Your task is to create a beautiful well structured response for the user"""
 
-    chat.append({"role": "user", "content": process_result_query})
-    # print("\n\n\n", chat, "\n\n\n")
+        self.chat.add("user", process_result_query, summary=f"The user asked: {user_query}. The SQL returned {len(db_result)} row(s).")
+
+        result_response = self.client.chat.completions.create(
+            model="gemini-2.5-flash",
+            messages=self.chat.messages
+        )
+        self.chat.add("assistant", result_response.choices[0].message.content)
+        return result_response.choices[0].message.content
+
+
+def main():
+    rag = RagChat()
+    # index and clients load while the first question is being typed
+    warm = threading.Thread(target=rag.warm_up, daemon=True)
+    warm.start()
+    while True:
+        user_query = input("User : ")
+        warm.join()
+        print("assistant : ", rag.ask(user_query))
 
-    result_response = client.chat.completions.create(
-        model="gemini-2.5-flash",
-        messages=chat
-    )
-    chat.append({"role": "assistant", "content": result_response.choices[0].message.content})
 
-    print("assistant : ", result_response.choices[0].message.content)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# retriever.py
+import json
+import os
+
+import numpy as np
+
+
+def foreign_key_graph(schema_dict: dict) -> dict[str, set[str]]:
+    # undirected: a table's join partners are the tables it references and the ones referencing it
+    graph = {table: set() for table in schema_dict}
+    for table, info in schema_dict.items():
+        for fk in info["foreign_keys"]:
+            referred = fk["referred_table"]
+            if referred in graph and referred != table:
+                graph[table].add(referred)
+                graph[referred].add(table)
+    return graph
+
+
+class SchemaRetriever:
+    def __init__(self, tables: list[str], documents: list[str], vectors, graph: dict[str, set[str]] | None = None):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+        self.tables = tables
+        self.documents = dict(zip(tables, documents))
+        self.graph = graph or {}
+
+    def save(self, path: str, **metadata):
+        # vectors are stored already normalized, so loading is a plain array read
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            tables=np.array(self.tables, dtype=str),
+            documents=np.array([self.documents[t] for t in self.tables], dtype=str),
+            matrix=self.matrix,
+            graph=np.array(json.dumps({t: sorted(p) for t, p in self.graph.items()})),
+            metadata=np.array(json.dumps(metadata)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple["SchemaRetriever", dict]:
+        data = np.load(path, allow_pickle=False)
+        graph = {t: set(p) for t, p in json.loads(str(data["graph"])).items()}
+        retriever = cls(data["tables"].tolist(), data["documents"].tolist(), data["matrix"], graph)
+        return retriever, json.loads(str(data["metadata"]))
+
+    def top_k(self, query_vector, k: int = 4) -> list[tuple[str, float]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        # argpartition is O(n); only the k winners get sorted
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.tables[i], float(scores[i])) for i in best]
+
+    def search(self, query_vector, k: int = 4, expand_fk: bool = True, max_expanded: int = 4) -> list[str]:
+        hits = [table for table, _ in self.top_k(query_vector, k)]
+        selected = list(hits)
+        if expand_fk:
+            for table in hits:
+                for partner in sorted(self.graph.get(table, ())):
+                    if len(selected) >= len(hits) + max_expanded:
+                        break
+                    if partner not in selected:
+                        selected.append(partner)
+        return selected
+
+    def context(self, query_vector, k: int = 4, expand_fk: bool = True) -> str:
+        return "\n".join(self.documents[table] for table in self.search(query_vector, k, expand_fk))
@@ -1,8 +1,9 @@
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, text
 from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
+from fast.schema_cache import SchemaCache
 
 
 
@@ -19,17 +20,13 @@ def format_print(key : str, value : str):
     print(value)
     print("=".center(20, "="), end="\n\n")
 
+engine = create_engine(os.getenv("DB_URI"))
+schema_cache = SchemaCache(engine)
+
 def get_schema_info():
-    engine = create_engine(os.getenv("DB_URI"))
-    insp = inspect(engine)
-    schema = {}
-    for table in insp.get_table_names():
-        cols = [col["name"] for col in insp.get_columns(table)]
-        schema[table] = cols
-    return schema
+    return schema_cache.get().tables
 
 def execute_query(query):
-    engine = create_engine(os.getenv("DB_URI"))
     with engine.connect() as conn:
         result = conn.execute(text(query))
         rows = result.fetchall()